@@ -0,0 +1,96 @@
+""" Startup benchmark: time from launching the viewer until its window is shown.
+
+Runs the viewer on a new interpreter several times, closing it as soon as the window is mapped,
+and fails if the median time to window is above the threshold, or if the viewer doesn't start.
+It's only skipped when there is no display.
+
+    python benchmarks/startup.py --runs 5 --threshold 1.0
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+start = time.perf_counter()
+from view import gui
+from controller.controller import Controller
+
+vw = gui.View("DICOM Reader")
+contr = Controller(vw)
+
+def mapped(event):
+    print("window", time.perf_counter() - start, flush=True)
+    vw.after_idle(vw.destroy)
+
+vw.bind("<Map>", mapped)
+contr.start()
+"""
+
+
+def display_available() -> bool:
+    """ True if Tk can open a window, the benchmark can't run without a display. """
+    import tkinter
+
+    try:
+        tkinter.Tk().destroy()
+    except tkinter.TclError:
+        return False
+    return True
+
+
+def time_to_window() -> float:
+    """ Launches the viewer and waits until its window is mapped.
+
+    Returns:
+        Seconds from the launch of the interpreter until the window is shown.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", CHILD], cwd=ROOT, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, universal_newlines=True)
+    for line in process.stdout:
+        if line.startswith("window"):
+            elapsed = time.perf_counter() - start
+            process.wait()
+            return elapsed
+
+    _, error = process.communicate()
+    raise RuntimeError(error.strip().splitlines()[-1] if error.strip() else "No window shown")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.0,
+                        help="Maximum median time to window, in seconds")
+    args = parser.parse_args()
+
+    if not display_available():
+        print("Startup benchmark skipped: no display available")
+        return 0
+
+    try:
+        times = [time_to_window() for _ in range(args.runs)]
+    except RuntimeError as error:
+        print(f"FAIL: the viewer didn't show its window: {error}")
+        return 1
+
+    median = statistics.median(times)
+    print(f"time to window: median {median:.3f}s, min {min(times):.3f}s, "
+          f"max {max(times):.3f}s ({args.runs} runs)")
+
+    if median > args.threshold:
+        print(f"FAIL: above the threshold of {args.threshold:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+""" Synthetic Dicom files for the benchmarks.
+
+Generates multiframe Dicom files with a phantom, a disk with some inserts over a gradient plus
+noise, so the histograms and the windows behave like on real images. The files are
+deterministic, the same arguments always write the same pixels. With 3 samples per pixel the
+phantom is tinted and written as RGB.
+
+    python benchmarks/synthetic.py out.dcm --rows 512 --columns 512 --frames 64 --syntax rle
+
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from pydicom.dataset import Dataset, FileDataset
+from pydicom.encaps import encapsulate
+from pydicom.pixel_data_handlers.rle_handler import rle_encode_frame
+from pydicom.uid import (ExplicitVRLittleEndian, ImplicitVRLittleEndian, ExplicitVRBigEndian,
+                         RLELossless, generate_uid)
+
+SYNTAXES = {"explicit": ExplicitVRLittleEndian, "implicit": ImplicitVRLittleEndian,
+            "big": ExplicitVRBigEndian, "rle": RLELossless}
+
+CT_IMAGE_STORAGE = "1.2.840.10008.5.1.4.1.1.2"
+
+
+def phantom(rows: int, columns: int, frames: int, bits: int = 16, signed: bool = True,
+            seed: int = 0) -> np.ndarray:
+    """ Volume of shape (frames, rows, columns) with a phantom.
+
+    Args:
+        rows (int): Rows of each frame.
+        columns (int): Columns of each frame.
+        frames (int): Number of frames.
+        bits (int): 8 or 16 bits per pixel.
+        signed (bool): If true the values are signed, as the stored values of a CT.
+        seed (int): Seed of the noise.
+
+    Returns:
+
+    """
+    dtype = np.dtype(f"{'i' if signed else 'u'}{bits // 8}")
+    info = np.iinfo(dtype)
+    low, high = (max(info.min, -1024), min(info.max, 3071)) if bits == 16 else (info.min,
+                                                                                  info.max)
+
+    y, x = np.mgrid[0:rows, 0:columns]
+    y = (y - rows / 2) / (rows / 2)
+    x = (x - columns / 2) / (columns / 2)
+    radius = np.hypot(x, y)
+
+    rng = np.random.default_rng(seed)
+    volume = np.empty((frames, rows, columns), dtype=dtype)
+    for frame in range(frames):
+        z = frame / max(frames - 1, 1)
+        img = np.full((rows, columns), 0.05)
+        img[radius < 0.9] = 0.35 + 0.1 * z
+        img[np.hypot(x - 0.3, y) < 0.2 + 0.1 * z] = 0.75
+        img[np.hypot(x + 0.3, y + 0.2) < 0.15] = 0.2
+        img += 0.1 * x + rng.normal(0, 0.02, (rows, columns))
+
+        volume[frame] = np.clip(low + img * (high - low), low, high).astype(dtype)
+
+    return volume
+
+
+def make_dicom(path: str, rows: int = 512, columns: int = 512, frames: int = 16,
+               bits: int = 16, signed: bool = True, syntax: str = "explicit",
+               seed: int = 0, samples: int = 1) -> np.ndarray:
+    """ Writes a multiframe Dicom file with a phantom.
+
+    Args:
+        path (str): Path of the file.
+        rows (int): Rows of each frame.
+        columns (int): Columns of each frame.
+        frames (int): Number of frames.
+        bits (int): 8 or 16 bits per pixel.
+        signed (bool): If true the values are signed, with a rescale to Hounsfield units.
+        syntax (str): Transfer syntax, one of SYNTAXES.
+        seed (int): Seed of the noise.
+        samples (int): Samples per pixel, 1 for monochrome or 3 for RGB.
+
+    Returns:
+        The volume written.
+    """
+    transfer_syntax = SYNTAXES[syntax]
+    volume = phantom(rows, columns, frames, bits, signed, seed)
+    if samples == 3:
+        tint = np.array([1.0, 0.8, 0.6])
+        volume = (volume[..., np.newaxis] * tint).astype(volume.dtype)
+
+    meta = Dataset()
+    meta.TransferSyntaxUID = transfer_syntax
+    meta.MediaStorageSOPClassUID = CT_IMAGE_STORAGE
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+
+    ds = FileDataset(path, {}, file_meta=meta, preamble=b"\0" * 128)
+    ds.is_little_endian = transfer_syntax != ExplicitVRBigEndian
+    ds.is_implicit_VR = transfer_syntax == ImplicitVRLittleEndian
+
+    ds.SOPClassUID = CT_IMAGE_STORAGE
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.StudyInstanceUID = generate_uid()
+    ds.SeriesInstanceUID = generate_uid()
+    ds.PatientID = "SYNTHETIC"
+    ds.PatientName = "Synthetic^Phantom"
+    ds.Modality = "CT"
+
+    ds.Rows = rows
+    ds.Columns = columns
+    ds.NumberOfFrames = frames
+    ds.SamplesPerPixel = samples
+    ds.PhotometricInterpretation = "RGB" if samples == 3 else "MONOCHROME2"
+    if samples == 3:
+        ds.PlanarConfiguration = 0
+    ds.BitsAllocated = bits
+    ds.BitsStored = bits
+    ds.HighBit = bits - 1
+    ds.PixelRepresentation = int(signed)
+    ds.PixelSpacing = [0.7, 0.7]
+    ds.SliceThickness = 1.5
+    if signed and bits == 16 and samples == 1:
+        ds.RescaleSlope = 1
+        ds.RescaleIntercept = 0
+        ds.WindowCenter = 40
+        ds.WindowWidth = 400
+
+    if transfer_syntax == RLELossless:
+        ds.PixelData = encapsulate([rle_encode_frame(frame) for frame in volume])
+        ds["PixelData"].VR = "OB"
+        ds["PixelData"].is_undefined_length = True
+    elif transfer_syntax == ExplicitVRBigEndian:
+        ds.PixelData = volume.astype(volume.dtype.newbyteorder(">")).tobytes()
+    else:
+        ds.PixelData = volume.tobytes()
+
+    ds.save_as(path, write_like_original=False)
+
+    return volume
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=512)
+    parser.add_argument("--columns", type=int, default=512)
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--bits", type=int, choices=(8, 16), default=16)
+    parser.add_argument("--unsigned", action="store_true")
+    parser.add_argument("--syntax", choices=sorted(SYNTAXES), default="explicit")
+    parser.add_argument("--samples", type=int, choices=(1, 3), default=1)
+    args = parser.parse_args()
+
+    make_dicom(args.path, args.rows, args.columns, args.frames, args.bits, not args.unsigned,
+               args.syntax, samples=args.samples)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
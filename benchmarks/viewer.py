@@ -0,0 +1,209 @@
+""" Benchmark of the model of the viewer on synthetic Dicom files.
+
+For each case, a file of a size, bit depth, number of frames and transfer syntax, times the
+operations of the viewer: open, first frame, slice scroll, contrast change, zoom and pan,
+histogram and pixel probe. The results are written as JSON, with the commit they were taken on,
+and can be compared with the results of another commit.
+
+    python benchmarks/viewer.py --output before.json
+    python benchmarks/viewer.py --output after.json --compare before.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic import make_dicom  # noqa: E402
+
+VIEW_SIZE = (600, 400)
+
+# rows, columns, frames, bits, signed, syntax, samples per pixel
+CASES = [
+    (256, 256, 64, 16, True, "explicit", 1),
+    (512, 512, 64, 16, True, "explicit", 1),
+    (512, 512, 64, 16, True, "implicit", 1),
+    (512, 512, 64, 16, True, "big", 1),
+    (512, 512, 64, 16, True, "rle", 1),
+    (512, 512, 64, 8, False, "explicit", 1),
+    (512, 512, 16, 8, False, "explicit", 3),
+    (1024, 1024, 16, 16, True, "explicit", 1),
+]
+QUICK_CASES = [
+    (256, 256, 16, 16, True, "explicit", 1),
+    (256, 256, 16, 16, True, "rle", 1),
+    (256, 256, 16, 8, False, "explicit", 3),
+]
+
+
+def case_name(case) -> str:
+    rows, columns, frames, bits, signed, syntax, samples = case
+    name = f"{rows}x{columns}x{frames}_{'' if signed else 'u'}int{bits}_{syntax}"
+    return name + "_rgb" if samples == 3 else name
+
+
+def measure(function, repeat: int, setup=None) -> dict:
+    """ Runs a function repeat times.
+
+    Args:
+        function: Function timed.
+        repeat (int): Number of runs.
+        setup: Function run before each run without timing it, its result is passed to
+            function.
+
+    Returns:
+        Dictionary with the number of runs and the minimum, median and mean time in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+
+    return {"runs": repeat, "min": min(times), "median": statistics.median(times),
+            "mean": statistics.mean(times)}
+
+
+def run_case(path: str, frames: int, repeat: int) -> dict:
+    """ Times the operations of the viewer on a file.
+
+    The open and the first frame are timed on new images, the rest of the operations on an image
+    already opened, as the viewer does while the user interacts with it. The scroll is timed
+    cold, on a new image each run so the frames are decoded and rendered, and warm, on an image
+    with the frames already on its cache.
+    """
+    from model.dicom_files import DicomImage
+
+    results = {}
+    results["open"] = measure(lambda: DicomImage(path, VIEW_SIZE), repeat)
+    results["first_frame"] = measure(lambda: DicomImage(path, VIEW_SIZE)[0], repeat)
+
+    image = DicomImage(path, VIEW_SIZE)
+    middle = frames // 2
+
+    def scroll(scrolled):
+        for item in range(frames):
+            scrolled[item]
+
+    results["scroll"] = measure(scroll, repeat, setup=lambda: DicomImage(path, VIEW_SIZE))
+    results["scroll"]["per_slice"] = results["scroll"]["median"] / frames
+
+    scroll(image)
+    results["scroll_warm"] = measure(lambda: scroll(image), repeat)
+    results["scroll_warm"]["per_slice"] = results["scroll_warm"]["median"] / frames
+
+    contrasts = iter(np.random.default_rng(0).uniform(0, 0.5, (repeat, 2)) + [0, 0.5])
+
+    def contrast():
+        image.contrast = list(next(contrasts))
+        image[middle]
+
+    results["contrast"] = measure(contrast, repeat)
+
+    image.resize_factor = 3
+    positions = iter(np.random.default_rng(1).integers(0, 800, (repeat, 2)))
+
+    def zoom_pan():
+        image.position = next(positions)
+        image[middle]
+
+    results["zoom_pan"] = measure(zoom_pan, repeat)
+    image.resize_factor = 1
+    image.position = [0, 0]
+
+    histogram_items = iter(np.arange(repeat) % frames)
+    results["histogram"] = measure(
+        lambda: DicomImage(path, VIEW_SIZE).get_histogram(int(next(histogram_items))), repeat)
+
+    points = np.random.default_rng(2).integers(0, min(VIEW_SIZE), (1000, 2))
+
+    def probe():
+        for x, y in points:
+            image.probe(x, y, middle)
+
+    results["probe"] = measure(probe, repeat)
+    results["probe"]["per_call"] = results["probe"]["median"] / len(points)
+
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, previous: dict):
+    """ Prints the ratio of the median times of two runs, above 1 is slower.  """
+    print(f"\nCompared with {previous.get('commit', 'unknown')[:10]}:")
+    for case, operations in results["cases"].items():
+        old_operations = previous.get("cases", {}).get(case)
+        if old_operations is None:
+            continue
+        for operation, timing in operations.items():
+            old = old_operations.get(operation)
+            if old is None or old["median"] == 0:
+                continue
+            ratio = timing["median"] / old["median"]
+            print(f"  {case:40s} {operation:12s} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark.json", help="JSON file of the results")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="Only small cases")
+    parser.add_argument("--data", help="Directory of the synthetic files, by default a "
+                                       "temporary one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        data = args.data or temporary
+        os.makedirs(data, exist_ok=True)
+        # The statistics sidecars would make the opens of later runs faster
+        os.environ["DICOM_VIEWER_CACHE"] = os.path.join(temporary, "cache")
+
+        results = {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "python": platform.python_version(), "numpy": np.__version__,
+                   "machine": platform.machine(), "repeat": args.repeat, "cases": {}}
+
+        for case in QUICK_CASES if args.quick else CASES:
+            name = case_name(case)
+            path = os.path.join(data, name + ".dcm")
+            if not os.path.exists(path):
+                rows, columns, frames, bits, signed, syntax, samples = case
+                make_dicom(path, rows, columns, frames, bits, signed, syntax, samples=samples)
+
+            results["cases"][name] = run_case(path, case[2], args.repeat)
+            print(name)
+            for operation, timing in results["cases"][name].items():
+                print(f"  {operation:12s} median {timing['median'] * 1000:9.3f} ms")
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,32 +1,262 @@
-from model import dicom_files
-from matplotlib import pyplot as plt
+# -*- coding: utf-8 -*-
+""" Batch export of Dicom slices to images.
 
+Renders the slices of Dicom files, and of directories with a series, to PNG or JPEG files without
+the GUI. The slices are rendered and encoded in chunks on a pool of processes, with a bounded
+number of chunks in flight, and only the number of slices written comes back from the workers.
 
-def main():
-    menu = "*" * 50
-    menu += "\n Dicom Viewer \n \t Miquel Miró Nicolau \n"
-    menu += "*" * 50
+Example:
+    python console.py in/ct.dcm in/series/ -o out/ --window 40 400 --size 512 512 --format jpg
 
-    print(menu)
-    while True:
-        path = input("Path a la imatge (si vols sortir pitja s): \n")
+"""
 
-        if path.lower() == "s":
-            break
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, NamedTuple, Optional, Tuple
+import argparse
+import os
+import sys
+import tempfile
+import time
 
-        dcm = dicom_files.DicomImage(path)
+FORMATS = ("png", "jpg")
+CHUNK = 16
+WORKER_CACHE = 32 * 1024 * 1024
 
-        print("*" * 50)
-        tall = input("Quin tall vols veure ( 0 - " + str(len(dcm) - 1) + " ) ?")
+_IMAGE = None
 
-        while tall.isdigit():
-            tall = int(tall)
-            plt.imshow(dcm[tall])
-            plt.show()
 
-            tall = input(
-                "Si vols veure un altre tall indica el número sinó pitja una altre tecla per "
-                "seleccionar una nova imatge ( 0 - " + str(len(dcm) - 1) + " ): \n")
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Exporta els talls de fitxers Dicom a imatges PNG o JPEG.")
+    parser.add_argument("inputs", nargs="+",
+                        help="Fitxers Dicom o directoris amb una sèrie, un tall per fitxer.")
+    parser.add_argument("-o", "--output", required=True, help="Directori de sortida.")
+    parser.add_argument("--format", choices=FORMATS, default="png", help="Format de les imatges.")
+    parser.add_argument("--quality", type=int, default=95, help="Qualitat de les imatges JPEG.")
+    parser.add_argument("--window", type=float, nargs=2, metavar=("CENTRE", "AMPLADA"),
+                        help="Finestra en unitats de modalitat, per defecte la del fitxer.")
+    parser.add_argument("--contrast", type=float, nargs=2, metavar=("MIN", "MAX"),
+                        help="Fracció dels valors de cada tall mostrada, entre 0 i 1.")
+    parser.add_argument("--size", type=int, nargs=2, metavar=("AMPLADA", "ALÇADA"),
+                        help="Mida màxima de les imatges, es manté la relació d'aspecte.")
+    parser.add_argument("--plane", choices=("axial", "coronal", "sagittal"), default="axial",
+                        help="Pla dels talls.")
+    parser.add_argument("--projection", nargs=2, metavar=("MODE", "GRUIX"),
+                        help="Projecció (mip, minip o avgip) de llesques de GRUIX talls.")
+    parser.add_argument("--series", help="SeriesInstanceUID a exportar dels directoris.")
+    parser.add_argument("--slices", type=int, nargs=2, metavar=("INICI", "FINAL"),
+                        help="Rang de talls a exportar, el final no s'inclou.")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Nombre de processos.")
+    parser.add_argument("--chunk", type=int, default=CHUNK,
+                        help="Talls renderitzats per cada tasca.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No mostra el progrés.")
 
+    args = parser.parse_args(argv)
+    if args.projection is not None:
+        from model.projection import OPERATIONS
 
-main()
+        mode, thickness = args.projection
+        if mode not in OPERATIONS:
+            parser.error(f"--projection: mode desconegut '{mode}', ha de ser "
+                         f"{', '.join(OPERATIONS)}")
+        try:
+            thickness = int(thickness)
+        except ValueError:
+            thickness = 0
+        if thickness < 1:
+            parser.error(f"--projection: el gruix ha de ser un enter positiu, "
+                         f"no '{args.projection[1]}'")
+        args.projection = (mode, thickness)
+
+    return args
+
+
+class Chunk(NamedTuple):
+    """
+    Range of slices of an input exported by a task.
+
+    The name of the images is the one of the input, with its position among the inputs if
+    another input has the same name. The files are the ones of the series of a directory, and
+    volume the .npy file with the volume decoded by the main process for the planes other than
+    the axial one.
+
+    """
+    path: str
+    start: int
+    stop: int
+    name: str
+    files: Optional[List[str]] = None
+    volume: Optional[str] = None
+
+
+def _open_image(chunk: Chunk, options: dict):
+    """ DicomImage of the input of a chunk with the options of the export.
+
+    Each process keeps only the last image opened, so the memory of a worker is bounded by one
+    volume and its frame cache. The files of the series of a directory are the ones found by
+    plan, so the workers don't scan the directory again, and the volume decoded by the main
+    process is mapped, not decoded again. The workers don't start processes to decode it.
+    """
+    global _IMAGE
+    import numpy as np
+    from model.dicom_files import DicomImage
+
+    key = (chunk.path, chunk.volume, tuple(sorted(options.items())))
+    if _IMAGE is None or _IMAGE[0] != key:
+        _IMAGE = None
+        volume = None
+        if chunk.volume is not None:
+            volume = np.load(chunk.volume, mmap_mode="r")
+        image = DicomImage(chunk.path, options["size"], cache_size=WORKER_CACHE,
+                           series_uid=options["series"], files=chunk.files, workers=1,
+                           volume=volume)
+        image.plane = options["plane"]
+        image.projection = options["projection"]
+        if options["window"] is not None:
+            image.window = options["window"]
+        elif options["contrast"] is not None:
+            image.contrast = list(options["contrast"])
+        _IMAGE = (key, image)
+
+    return _IMAGE[1]
+
+
+def output_path(output: str, name: str, plane: str, item: int, extension: str) -> str:
+    return os.path.join(output, f"{name}_{plane}_{item:04d}.{extension}")
+
+
+def export_chunk(chunk: Chunk, output: str, options: dict) -> int:
+    """ Renders and writes a range of slices, runs on the worker processes.
+
+    Args:
+        chunk (Chunk): Input and range of slices.
+        output (str): Output directory.
+        options (dict): Render options, see _open_image.
+
+    Returns:
+        Number of slices written.
+    """
+    import cv2
+
+    image = _open_image(chunk, options)
+    params = []
+    if options["format"] == "jpg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, options["quality"]]
+
+    for item in range(chunk.start, chunk.stop):
+        img = image[item]
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+        filename = output_path(output, chunk.name, options["plane"], item, options["format"])
+        if not cv2.imwrite(filename, img, params):
+            raise OSError(f"No s'ha pogut escriure {filename}")
+
+    return chunk.stop - chunk.start
+
+
+def _names(paths: List[str]) -> List[str]:
+    """ Names of the images of each input, the repeated ones followed by their position.  """
+    names = [os.path.splitext(os.path.basename(os.path.normpath(path)))[0] for path in paths]
+
+    return [f"{name}-{i}" if names.count(name) > 1 else name for i, name in enumerate(names)]
+
+
+def plan(args: argparse.Namespace, options: dict, directory: str) -> List[Chunk]:
+    """ Chunks of slices of all the inputs.
+
+    The directories are scanned only here, the sorted files of their series are passed to the
+    workers with each chunk. The coronal and sagittal planes need the whole volume, unless it's
+    mapped from the file it's decoded here once, on args.workers processes, and saved on
+    directory for the workers.
+    """
+    import numpy as np
+    from model.dicom_files import DicomImage
+    from model.series import load_series
+
+    chunks = []
+    for i, (path, name) in enumerate(zip(args.inputs, _names(args.inputs))):
+        files = None
+        if os.path.isdir(path):
+            files = load_series(path, options["series"]).paths
+        image = DicomImage(path, series_uid=options["series"], files=files,
+                           workers=args.workers)
+        image.plane = options["plane"]
+        start, stop = 0, len(image)
+        if args.slices is not None:
+            start, stop = max(args.slices[0], 0), min(args.slices[1], stop)
+
+        volume = None
+        if options["plane"] != "axial" and image.backend != "memmap" and start < stop:
+            volume = os.path.join(directory, f"{i}.npy")
+            np.save(volume, image.get_volume())
+
+        for first in range(start, stop, args.chunk):
+            chunks.append(Chunk(path, first, min(first + args.chunk, stop), name, files, volume))
+
+    return chunks
+
+
+def export(args: argparse.Namespace) -> Tuple[int, float]:
+    """ Exports the slices of all the inputs.
+
+    At most two chunks per worker are pending at any time, so the memory doesn't grow with the
+    number of slices.
+
+    Returns:
+        Number of slices written and seconds spent.
+    """
+    options = {"size": args.size, "series": args.series, "plane": args.plane,
+               "projection": args.projection, "format": args.format, "quality": args.quality,
+               "window": None if args.window is None else tuple(args.window),
+               "contrast": None if args.contrast is None else tuple(args.contrast)}
+
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+    done = 0
+    with tempfile.TemporaryDirectory(prefix=".volumes-", dir=args.output) as directory:
+        chunks = plan(args, options, directory)
+        total = sum(chunk.stop - chunk.start for chunk in chunks)
+
+        with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+            pending = set()
+            chunks = iter(chunks)
+            while True:
+                while len(pending) < 2 * max(args.workers, 1):
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.add(pool.submit(export_chunk, chunk, args.output, options))
+                if not pending:
+                    break
+
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done += future.result()
+                if not args.quiet:
+                    _progress(done, total, time.perf_counter() - start)
+
+    if not args.quiet and total:
+        sys.stderr.write("\n")
+
+    return done, time.perf_counter() - start
+
+
+def _progress(done: int, total: int, elapsed: float):
+    rate = done / elapsed if elapsed > 0 else 0.0
+    sys.stderr.write(f"\r{done}/{total} talls ({rate:.1f} talls/s)")
+    sys.stderr.flush()
+
+
+def main(argv: List[str] = None) -> Optional[int]:
+    args = parse_args(argv)
+    done, elapsed = export(args)
+
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"{done} talls exportats a {args.output} en {elapsed:.2f} s ({rate:.1f} talls/s)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
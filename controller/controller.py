@@ -1,13 +1,18 @@
 from view import gui, tktable
-from tkinter.filedialog import askopenfilename
-from model.dicom_files import DicomImage
+from controller.scheduler import RenderScheduler
+from controller.render_worker import RenderWorker
+from controller.history import ActionHistory
+from model.profiling import PROFILER
+from tkinter.filedialog import askopenfilename, askdirectory, asksaveasfilename
 from tkinter import messagebox
 import numpy as np
 import math
-from matplotlib import pyplot as plt
 from typing import List
 import time
-import pandas as pd
+import threading
+
+# The model (pydicom, cv2) and matplotlib are imported when a file is opened or the feature used,
+# so the window appears without waiting for them.
 
 
 def exist_model(func):
@@ -22,29 +27,23 @@ def exist_model(func):
 
 def save_actions(func):
     name = func.__name__
+    metric = "action." + name
 
     def wrapper(controller, *args):
-        date = time.strftime("%H:%M:%S")
+        timestamp = time.time()
         str_args = ""
         for a in args:
             str_args += str(a)
-        row = [date, name, str_args]
-        controller.add_2_history(row)
-        func(controller, *args)
-
-    return wrapper
-
-
-LOOKUP = None
-
 
-def load_lookup():
-    global LOOKUP
+        start = time.perf_counter()
+        try:
+            func(controller, *args)
+        finally:
+            duration = time.perf_counter() - start
+            PROFILER.record(metric, duration)
+            controller.add_2_history(name, str_args, duration, timestamp)
 
-    if LOOKUP is None:
-        df = pd.read_excel("./in/lookup.ods", engine="odf")
-        df = df[["Tag", "Name"]]
-        LOOKUP = df.set_index('Tag').T.to_dict('list')
+    return wrapper
 
 
 class Controller:
@@ -52,14 +51,23 @@ class Controller:
     def __init__(self, view: gui.View):
         self.__view = view
         self.__model = None
+        self.__prefetcher = None
+        self.__index = None
         self.__depth = 0
+        self.__depth_changed = False
+        self.__histogram_depth = None
+        self.__scheduler = RenderScheduler(view)
+        self.__renderer = RenderWorker(view)
 
         self.__position_first = None
-        self.__view.set_functions(file_o=self.open_file, header_s=self.show_headers,
+        self.__view.set_functions(file_o=self.open_file, series_o=self.open_series,
+                                  header_s=self.show_headers,
                                   depth=self.change_depth, zoom=self.change_zoom,
+                                  plane=self.change_plane, projection=self.change_projection,
                                   movements=[self.initial_movement, self.movement],
                                   histogram=self.histogram_movement, adv_viewer=self.show_adv_image,
                                   histogram_release=self.move_histogram, history=self.show_history,
+                                  export_profile=self.export_profile,
                                   pixel_value=('<Motion>', self.position_value),
                                   distance=('<Button-3>', self.calc_distance))
 
@@ -68,14 +76,26 @@ class Controller:
 
         self.__selected_point = None
         self.__distance_selected_point = None
-        self.__history = []
+        self.__history = ActionHistory()
+
+    @property
+    def render_stats(self) -> dict:
+        """ Events received and rendered of each kind of update of the view.  """
+        return self.__scheduler.stats()
 
-    def add_2_history(self, row):
-        self.__history.append(row)
+    @property
+    def render_latency(self) -> dict:
+        """ Renders requested, shown and discarded, and their latency in seconds.  """
+        return self.__renderer.stats()
+
+    def add_2_history(self, name: str, args: str, duration: float, timestamp: float = None):
+        self.__history.append(name, args, duration, timestamp)
 
     @exist_model
     @save_actions
     def show_adv_image(self):
+        from matplotlib import pyplot as plt
+
         plt.figure()
         plt.imshow(self.__model[self.__depth])
         plt.show()
@@ -90,38 +110,117 @@ class Controller:
             filetypes=[("Dicom files", "*.dcm")]
         )
         if filepath:
-            self.__model = DicomImage(filepath, self.__view.img_space)
-            self.__view.show_image(self.__model[0], histogram=self.__model.get_histogram(0))
-            self.__view.set_n_images(len(self.__model))
+            self.__load_model(filepath)
         self.__view.title(f"DICOM Reader - {filepath}")
 
+    @save_actions
+    def open_series(self):
+        """Open a directory with a series, one slice per file."""
+        dirpath = askdirectory()
+        if dirpath:
+            if self.__index is None:
+                from model.index import DicomIndex
+
+                self.__index = DicomIndex()
+            self.__load_model(dirpath, index=self.__index)
+        self.__view.title(f"DICOM Reader - {dirpath}")
+
+    def __load_model(self, path: str, index=None):
+        from model.dicom_files import DicomImage
+        from model.prefetch import SlicePrefetcher
+
+        self.__scheduler.cancel()
+        self.__renderer.cancel()
+        if self.__prefetcher is not None:
+            self.__prefetcher.close()
+        if self.__model is not None:
+            self.__model.close()
+        self.__model = DicomImage(path, self.__view.img_space, index=index)
+        self.__prefetcher = SlicePrefetcher(self.__model)
+        threading.Thread(target=self.__model.compute_statistics, daemon=True).start()
+
+        self.__depth = 0
+        self.__histogram_depth = None
+        self.__schedule_view_image()
+        self.__view.set_n_images(len(self.__model))
+        self.__view.set_depth(0)
+        self.__view.set_plane(self.__model.plane)
+        self.__view.set_projection("none")
+
     @exist_model
     @save_actions
     def show_headers(self):
-        global LOOKUP
-        dades = []
-
-        for h, v in self.__model.get_header():
-            str_v = str(v)
-            str_h = str(h).replace(" ", "")
-            if hasattr(v, 'length'):
-                if v.length > 200:
-                    str_v = str_v[:400]
-            if str_h in LOOKUP:
-                str_h = LOOKUP[str_h][0]
-            dades.append([str_h, str_v])
-        tktable.make_table("Capceleres", dades, ["Clau", "Valor"])
+        """ Shows the header of the file as a tree, the sequences are opened by double clicking.
+
+        The file is parsed again without the pixel data, and only the visible rows are shown.
+        """
+        from model.header import HeaderTree, read_header
+
+        tree = HeaderTree(read_header(self.__model.header_path))
+        tktable.make_virtual_table("Capceleres", len(tree), tree.row,
+                                   ["Clau", "Etiqueta", "VR", "Valor"], activate=tree.toggle,
+                                   first=0)
 
     def show_history(self):
-        tktable.make_table("History", self.__history, ["Temps", "Funció", 'Parametres'])
+        """ Shows the actions done followed by the summary of the timings of the profiler. """
+        history = self.__history
+        metrics = PROFILER.summary()
+
+        def get_row(idx):
+            if idx < len(history):
+                return history.row(idx)
+            metric = metrics[idx - len(history)]
+            return ["Perfil", metric["name"],
+                    f"n={metric['count']} mitjana={metric['mean'] * 1000:.2f} "
+                    f"p95={metric['p95'] * 1000:.2f} màx={metric['max'] * 1000:.2f}",
+                    f"{metric['total'] * 1000:.2f}"]
+
+        tktable.make_virtual_table("History", len(history) + len(metrics), get_row,
+                                   ["Temps", "Funció", 'Parametres', "Durada (ms)"])
+
+    def export_profile(self):
+        """ Saves the timings of the profiler as JSON, with the actions done, or as CSV.  """
+        filepath = asksaveasfilename(defaultextension=".json",
+                                     filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if not filepath:
+            return
+
+        if filepath.lower().endswith(".csv"):
+            PROFILER.to_csv(filepath)
+        else:
+            PROFILER.to_json(filepath, history=list(self.__history))
 
     @exist_model
     @save_actions
     def change_depth(self, value):
-        depth = int(value) // 2
-        self.__depth = depth
+        self.__depth = int(value)
+        self.__depth_changed = True
+
+        self.__schedule_view_image()
+
+    @exist_model
+    @save_actions
+    def change_plane(self, plane: str):
+        """ Shows the slices of another plane, starting from the middle one.  """
+        self.__model.plane = plane
+        self.__prefetcher.invalidate()
+
+        self.__depth = len(self.__model) // 2
+        self.__depth_changed = True
+        self.__histogram_depth = None
+        self.__view.set_n_images(len(self.__model))
+        self.__view.set_depth(self.__depth)
+        self.__schedule_view_image()
 
-        self.__update_view_image(update_histogram=True)
+    @exist_model
+    @save_actions
+    def change_projection(self, mode: str, thickness: int):
+        """ Shows the projection of slabs of thickness slices, or single slices if mode is none. """
+        self.__model.projection = None if mode == "none" else (mode, thickness)
+        self.__prefetcher.invalidate()
+
+        self.__histogram_depth = None
+        self.__schedule_view_image()
 
     @exist_model
     @save_actions
@@ -129,7 +228,8 @@ class Controller:
         zoom = int(value)
 
         self.__model.resize_factor = zoom
-        self.__update_view_image()
+        self.__prefetcher.invalidate()
+        self.__schedule_view_image()
 
     @exist_model
     def initial_movement(self, event):
@@ -146,11 +246,20 @@ class Controller:
         self.__position_first = None
 
         self.__model.move_image(old_position - position)
-        self.__update_view_image()
+        self.__prefetcher.invalidate()
+        self.__schedule_view_image()
 
     @exist_model
     def histogram_movement(self, event):
-        new_pos = np.array([event.x, event.y - 1])
+        self.__scheduler.request("histogram", self.__move_histogram_line,
+                                 np.array([event.x, event.y - 1]))
+
+    def __move_histogram_line(self, new_pos: np.ndarray):
+        """ Moves the selected line of the histogram to the last position of the mouse.
+
+        The displacement is computed from the last position handled, so the coalesced events
+        are moved at once.
+        """
         last_pos = self.__h_last_mouse_pos
 
         idx_line = self.__selected_line
@@ -171,15 +280,13 @@ class Controller:
     @exist_model
     @save_actions
     def move_histogram(self, event):
+        self.__scheduler.flush("histogram")
         self.__selected_line = None
         self.__h_last_mouse_pos = None
 
-        histogram_bbox = self.__view.get_histogram_position()
-        width = histogram_bbox[2] - histogram_bbox[0]
-
-        horizontal_pos = [min((line[0] / width), 1) for line in self.__view.lines_position()]
-        self.__model.contrast = horizontal_pos
-        self.__update_view_image()
+        self.__model.contrast = sorted(self.__view.line_fractions())
+        self.__prefetcher.invalidate()
+        self.__schedule_view_image()
 
     def __nearest_line(self, position: np.ndarray):
         lines_pos = self.__view.lines_position()
@@ -196,10 +303,20 @@ class Controller:
         return min_idx, min_dist
 
     def position_value(self, event):
-        img_coordinates = self.__gui_coordinates_2_img_coordinates([event.x, event.y])
+        self.__scheduler.request("pixel", self.__show_pixel_value, event.x, event.y)
+
+    def __show_pixel_value(self, x: int, y: int):
+        img_coordinates = self.__gui_coordinates_2_img_coordinates([x, y])
         if img_coordinates is not None:
-            self.__view.set_pixel_text(
-                str(self.__model.get_pixel(img_coordinates[0], img_coordinates[1], self.__depth)))
+            probed = self.__model.probe(img_coordinates[0], img_coordinates[1], self.__depth)
+            if probed is None:
+                self.__view.set_pixel_text("")
+                return
+            value, rescaled = probed
+            text = str(value)
+            if rescaled != value:
+                text += f" ({rescaled:g})"
+            self.__view.set_pixel_text(text)
 
     @exist_model
     @save_actions
@@ -241,14 +358,83 @@ class Controller:
 
         return img_coordinates
 
-    def __update_view_image(self, update_histogram=False):
-        depth = self.__depth
+    def __schedule_view_image(self):
+        self.__scheduler.request("image", self.__render_view_image)
+
+    def __render_view_image(self):
+        """ Requests the render of the current state of the model to the render worker.
+
+        The histogram is rendered too if the one shown is of another slice. With zoom the image
+        is rendered in tiles, and only the tiles the view doesn't show yet are rendered.
+        """
+        model, prefetcher, depth = self.__model, self.__prefetcher, self.__depth
+        if model is None or depth >= len(model):
+            return
+
+        histogram_size = None
+        if depth != self.__histogram_depth:
+            histogram_size = self.__view.histogram_space
+
+        tiled = model.resize_factor > 1
+        if tiled:
+            known = self.__view.tiles_shown
+            self.__renderer.submit(
+                lambda: Controller.__render_tiles(model, depth, known, histogram_size),
+                lambda result: self.__show_tiles(depth, *result))
+        else:
+            self.__renderer.submit(
+                lambda: Controller.__render_image(model, prefetcher, depth, histogram_size),
+                lambda result: self.__show_render(depth, *result))
+
+        if self.__depth_changed:
+            self.__depth_changed = False
+            if not tiled:
+                prefetcher.notify(depth)
+
+    @staticmethod
+    def __render_image(model, prefetcher, depth: int, histogram_size):
+        """ Renders a slice and, if histogram_size isn't None, its histogram.
+
+        Runs on the thread of the render worker.
+        """
+        histogram = None
+        if histogram_size is not None:
+            histogram = model.get_histogram(depth, histogram_size)
+
+        return prefetcher.get(depth), histogram
+
+    @staticmethod
+    def __render_tiles(model, depth: int, known: frozenset, histogram_size):
+        """ Renders the new tiles of a slice and, if histogram_size isn't None, its histogram.
+
+        Runs on the thread of the render worker.
+        """
+        histogram = None
+        if histogram_size is not None:
+            histogram = model.get_histogram(depth, histogram_size)
+
+        return model.render_tiles(depth, known), histogram
+
+    def __show_render(self, depth: int, img: np.ndarray, histogram):
+        with PROFILER.timer("view.display"):
+            self.__view.show_image(img, histogram)
+        if histogram is not None:
+            self.__histogram_shown(depth)
+
+    def __histogram_shown(self, depth: int):
+        """ Places the lines of the histogram of a slice where the window applied is.  """
+        self.__histogram_depth = depth
+        self.__view.set_line_fractions(self.__model.contrast_of_window(depth))
 
-        histogram = self.__model.get_histogram(depth)
+    def __show_tiles(self, depth: int, tile_set, histogram):
+        """ Shows the tiles rendered, if the view removed a tile meanwhile it's rendered again.  """
+        with PROFILER.timer("view.display"):
+            complete = self.__view.show_tiles(tile_set, histogram)
+        if histogram is not None:
+            self.__histogram_shown(depth)
 
-        if self.__model is not None and depth < len(self.__model):
-            self.__view.show_image(self.__model[depth], histogram)
+        if not complete:
+            self.__schedule_view_image()
 
     def start(self):
-        load_lookup()
         self.__view.draw()
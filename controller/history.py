@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+""" History of the actions done on the viewer.
+
+The last actions are kept on a ring buffer of fixed capacity, the times and durations on arrays
+and the names of the actions as indices of a table of names, so the memory doesn't grow during
+a session. Optionally every action is also appended to a file, which keeps the whole history.
+
+"""
+
+from typing import Iterator, List, Optional
+import os
+import time
+
+import numpy as np
+
+CAPACITY = 10000
+MAX_ARGS = 80
+
+HISTORY_ENV = "DICOM_VIEWER_HISTORY"
+
+
+class ActionHistory:
+    """
+    Ring buffer with the last actions.
+
+    The rows are returned as the history table shows them: time of the day, name of the action,
+    arguments and duration in milliseconds.
+
+    """
+
+    def __init__(self, capacity: int = CAPACITY, spill_path: Optional[str] = None):
+        """ Constructor of the history.
+
+        Args:
+            capacity (int): Number of actions kept in memory.
+            spill_path (str): File where every action is appended as a tab separated line, by
+                default the one of the environment variable DICOM_VIEWER_HISTORY, if defined.
+        """
+        self.__capacity = capacity
+        self.__times = np.zeros(capacity, dtype=np.float64)
+        self.__durations = np.zeros(capacity, dtype=np.float32)
+        self.__actions = np.zeros(capacity, dtype=np.uint16)
+        self.__args: List[str] = [""] * capacity
+
+        self.__names: List[str] = []
+        self.__name_ids = {}
+
+        self.__next = 0
+        self.__count = 0
+
+        if spill_path is None:
+            spill_path = os.environ.get(HISTORY_ENV)
+        self.__spill = None
+        if spill_path:
+            self.__spill = open(spill_path, "a", buffering=1, encoding="utf-8")
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def append(self, name: str, args: str, duration: float, timestamp: float = None):
+        """ Adds an action, replacing the oldest one if the buffer is full.
+
+        Args:
+            name (str): Name of the action.
+            args (str): Arguments of the action, truncated to MAX_ARGS characters.
+            duration (float): Duration in seconds.
+            timestamp (float): Time of the action, by default now.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        args = args[:MAX_ARGS].replace("\t", " ").replace("\n", " ")
+
+        name_id = self.__name_ids.get(name)
+        if name_id is None:
+            name_id = self.__name_ids[name] = len(self.__names)
+            self.__names.append(name)
+
+        idx = self.__next
+        self.__times[idx] = timestamp
+        self.__durations[idx] = duration
+        self.__actions[idx] = name_id
+        self.__args[idx] = args
+
+        self.__next = (idx + 1) % self.__capacity
+        self.__count = min(self.__count + 1, self.__capacity)
+
+        if self.__spill is not None:
+            self.__spill.write(f"{timestamp:.3f}\t{name}\t{args}\t{duration * 1000:.3f}\n")
+
+    def row(self, item: int) -> list:
+        """ Action of the buffer, the 0 is the oldest one kept.
+
+        Returns:
+            List with the time, name, arguments and duration in ms as strings.
+        """
+        if not 0 <= item < self.__count:
+            raise IndexError(f"Action {item} out of range (0 - {self.__count - 1})")
+
+        idx = (self.__next - self.__count + item) % self.__capacity
+
+        return [time.strftime("%H:%M:%S", time.localtime(self.__times[idx])),
+                self.__names[self.__actions[idx]], self.__args[idx],
+                f"{self.__durations[idx] * 1000:.2f}"]
+
+    def __iter__(self) -> Iterator[list]:
+        for item in range(self.__count):
+            yield self.row(item)
+
+    def close(self):
+        if self.__spill is not None:
+            self.__spill.close()
+            self.__spill = None
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+""" Render of the images out of the Tk thread.
+
+The decoding, resizing and windowing of the slices run on a background thread, NumPy and cv2
+release the GIL while they work. The Tk thread only submits the requests and shows the finished
+images, so a slow render doesn't freeze the window.
+
+"""
+
+from typing import Callable, Optional, Tuple
+import queue
+import threading
+import time
+import tkinter as tk
+
+from model.profiling import PROFILER
+
+POLL_MS = 5
+
+
+class RenderWorker:
+    """
+    Thread running the last render requested.
+
+    Only one request waits to be run, a new request replaces the waiting one. The results come
+    back to the Tk thread through a queue polled with after, and a result older than the last
+    one shown is discarded. The latencies are recorded on the profiler as view.latency.
+
+    """
+
+    def __init__(self, widget: tk.Misc, poll_ms: int = POLL_MS):
+        """ Constructor of the worker.
+
+        Args:
+            widget (tk.Misc): Widget whose event loop receives the results.
+            poll_ms (int): Milliseconds between two checks of the finished renders.
+        """
+        self.__widget = widget
+        self.__poll_ms = poll_ms
+
+        self.__condition = threading.Condition()
+        self.__job: Optional[Tuple[int, Callable, Callable, float]] = None
+        self.__results = queue.Queue()
+        self.__closed = False
+
+        self.__last_id = 0
+        self.__shown_id = 0
+        self.__polling = False
+
+        self.__requested = 0
+        self.__rendered = 0
+        self.__discarded = 0
+        self.__last_latency = 0.0
+        self.__total_latency = 0.0
+        self.__max_latency = 0.0
+
+        self.__thread = threading.Thread(target=self.__work, name="render", daemon=True)
+        self.__thread.start()
+
+    def submit(self, job: Callable, deliver: Callable):
+        """ Requests a render.
+
+        Must be called from the Tk thread.
+
+        Args:
+            job (Callable): Function, without arguments, doing the render on the worker thread.
+            deliver (Callable): Function called on the Tk thread with the result of the job.
+        """
+        self.__last_id += 1
+        self.__requested += 1
+
+        with self.__condition:
+            if self.__job is not None:
+                self.__discarded += 1
+            self.__job = (self.__last_id, job, deliver, time.perf_counter())
+            self.__condition.notify()
+
+        if not self.__polling:
+            self.__polling = True
+            self.__widget.after(self.__poll_ms, self.__poll)
+
+    def cancel(self):
+        """ Discards the waiting request and the results of the ones being rendered. """
+        with self.__condition:
+            if self.__job is not None:
+                self.__discarded += 1
+            self.__job = None
+        self.__shown_id = self.__last_id
+
+    def close(self):
+        with self.__condition:
+            self.__closed = True
+            self.__job = None
+            self.__condition.notify()
+
+    def stats(self) -> dict:
+        """ Number of requests, rendered and discarded, and latency in seconds of the renders.
+
+        The latency goes from the request to the result shown.
+        """
+        return {"requested": self.__requested, "rendered": self.__rendered,
+                "discarded": self.__discarded, "last": self.__last_latency,
+                "mean": self.__total_latency / self.__rendered if self.__rendered else 0.0,
+                "max": self.__max_latency}
+
+    def __work(self):
+        while True:
+            with self.__condition:
+                while self.__job is None and not self.__closed:
+                    self.__condition.wait()
+                if self.__closed:
+                    return
+                job_id, job, deliver, start = self.__job
+                self.__job = None
+
+            try:
+                result, error = job(), None
+            except Exception as e:
+                result, error = None, e
+            self.__results.put((job_id, deliver, start, result, error))
+
+    def __poll(self):
+        try:
+            self.__deliver_results()
+        finally:
+            if self.__shown_id < self.__last_id:
+                self.__widget.after(self.__poll_ms, self.__poll)
+            else:
+                self.__polling = False
+
+    def __deliver_results(self):
+        while True:
+            try:
+                job_id, deliver, start, result, error = self.__results.get_nowait()
+            except queue.Empty:
+                return
+
+            if job_id <= self.__shown_id:
+                self.__discarded += 1
+                continue
+            self.__shown_id = job_id
+            if error is not None:
+                raise error
+
+            deliver(result)
+
+            latency = time.perf_counter() - start
+            PROFILER.record("view.latency", latency)
+            self.__rendered += 1
+            self.__last_latency = latency
+            self.__total_latency += latency
+            self.__max_latency = max(self.__max_latency, latency)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+""" Scheduler of the updates of the view.
+
+Tk delivers every mouse and slider event, and doing the work of each one as it arrives makes the
+view lag behind the mouse. The updates are requested to the scheduler instead, which keeps only
+the last request of each kind and runs them together once per displayed frame.
+
+"""
+
+from collections import Counter
+from typing import Callable, Dict, Hashable, Tuple
+import time
+import tkinter as tk
+
+FRAME_TIME = 1 / 60
+
+
+class RenderScheduler:
+    """
+    Coalesces the requests of updates of the view.
+
+    Each request has a key, a new request with the key of a pending one replaces it, so only
+    the latest state is rendered. The pending requests are run on the Tk loop with after_idle,
+    or with after if the last ones were run less than a frame ago.
+
+    """
+
+    def __init__(self, widget: tk.Misc, frame_time: float = FRAME_TIME):
+        """ Constructor of the scheduler.
+
+        Args:
+            widget (tk.Misc): Widget whose event loop runs the updates.
+            frame_time (float): Minimum time, in seconds, between two runs of the updates.
+        """
+        self.__widget = widget
+        self.__frame_time = frame_time
+
+        self.__pending: Dict[Hashable, Tuple[Callable, tuple]] = {}
+        self.__after_id = None
+        self.__last_flush = 0.0
+
+        self.__requested = Counter()
+        self.__rendered = Counter()
+
+    def request(self, key: Hashable, callback: Callable, *args):
+        """ Requests an update of the view.
+
+        Args:
+            key (Hashable): Kind of update, replaces the pending request with the same key.
+            callback (Callable): Function doing the update.
+            *args: Arguments of the callback.
+        """
+        self.__requested[key] += 1
+        self.__pending[key] = (callback, args)
+
+        if self.__after_id is None:
+            wait = self.__frame_time - (time.perf_counter() - self.__last_flush)
+            if wait > 0:
+                self.__after_id = self.__widget.after(max(int(wait * 1000), 1), self.flush)
+            else:
+                self.__after_id = self.__widget.after_idle(self.flush)
+
+    def flush(self, key: Hashable = None):
+        """ Runs now the pending requests.
+
+        Args:
+            key (Hashable): If passed only the request with this key is run.
+        """
+        if key is not None:
+            request = self.__pending.pop(key, None)
+            if request is not None:
+                self.__run(key, *request)
+            return
+
+        if self.__after_id is not None:
+            self.__widget.after_cancel(self.__after_id)
+            self.__after_id = None
+        self.__last_flush = time.perf_counter()
+
+        pending, self.__pending = self.__pending, {}
+        for key, (callback, args) in pending.items():
+            self.__run(key, callback, args)
+
+    def cancel(self):
+        """ Discards the pending requests. """
+        self.__pending.clear()
+        if self.__after_id is not None:
+            self.__widget.after_cancel(self.__after_id)
+            self.__after_id = None
+
+    def stats(self) -> Dict[Hashable, dict]:
+        """ Number of requests of each key, and how many of them were rendered or coalesced.  """
+        return {key: {"requested": requested, "rendered": self.__rendered[key],
+                      "coalesced": requested - self.__rendered[key] - (key in self.__pending)}
+                for key, requested in self.__requested.items()}
+
+    def __run(self, key: Hashable, callback: Callable, args: tuple):
+        self.__rendered[key] += 1
+        callback(*args)
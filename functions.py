@@ -1,24 +1,87 @@
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
+import os
+from typing import Tuple
 import numpy as np
-from matplotlib import pyplot as plt
 
+CACHE_ENV = "DICOM_VIEWER_CACHE"
 
-def get_histogram(img: np.ndarray):
-    fig = Figure()
-    canvas = FigureCanvas(fig)
-    ax = fig.gca()
-    ax.axis('off')
-    fig.tight_layout(pad=0)
+HISTOGRAM_SIZE = (640, 480)
+HISTOGRAM_BINS = 64
 
-    # n_bins = min(255, img.max() + (img.min() * -1))
+BAR_COLOR = np.array([31, 119, 180], dtype=np.uint8)
+BACKGROUND_COLOR = np.array([255, 255, 255], dtype=np.uint8)
 
-    ax.hist(img.ravel())
-    canvas.draw()
 
-    w, h = fig.canvas.get_width_height()
-    histogram = np.fromstring(canvas.tostring_rgb(), dtype='uint8')
+def histogram_counts(img: np.ndarray, value_range: Tuple[float, float],
+                     bins: int = HISTOGRAM_BINS) -> np.ndarray:
+    """ Counts the values of an image on equal bins.
 
-    histogram = histogram.reshape((h, w, -1))
+    For integer images the bins are computed with a single bincount, without sorting the values.
 
-    return histogram
+    Args:
+        img (np.ndarray): Image or volume.
+        value_range (Tuple[float, float]): Minimum and maximum of the bins.
+        bins (int): Number of bins.
+
+    Returns:
+        Array with the number of values of each bin.
+    """
+    low, high = value_range
+
+    if img.dtype.kind in "ui":
+        values = img.ravel().astype(np.int64) - int(low)
+        idx = values * bins // max(int(high) - int(low) + 1, 1)
+        np.clip(idx, 0, bins - 1, out=idx)
+
+        return np.bincount(idx, minlength=bins)
+
+    counts, _ = np.histogram(img, bins=bins, range=(low, max(high, low + 1e-6)))
+
+    return counts
+
+
+def draw_histogram(counts: np.ndarray, size: Tuple[int, int] = HISTOGRAM_SIZE) -> np.ndarray:
+    """ Rasterizes the bars of an histogram.
+
+    Args:
+        counts (np.ndarray): Height of each bar.
+        size (Tuple[int, int]): Width and height of the image.
+
+    Returns:
+        RGB image of the histogram.
+    """
+    width, height = size
+
+    bar = np.arange(width) * len(counts) // width
+    heights = counts[bar] * (height / max(counts.max(), 1))
+
+    rows = np.arange(height, 0, -1)[:, np.newaxis]
+    mask = rows <= heights[np.newaxis, :]
+
+    return np.where(mask[..., np.newaxis], BAR_COLOR, BACKGROUND_COLOR)
+
+
+def get_histogram(img: np.ndarray, size: Tuple[int, int] = HISTOGRAM_SIZE,
+                  bins: int = HISTOGRAM_BINS):
+    counts = histogram_counts(img, (min(0, img.min()), img.max()), bins)
+
+    return draw_histogram(counts, size)
+
+
+def cache_dir(*parts: str) -> str:
+    """ Directory where the viewer keeps the files it can rebuild, created if needed.
+
+    The base directory is ~/.cache/dicom_viewer, it can be changed with the environment variable
+    DICOM_VIEWER_CACHE.
+
+    Args:
+        *parts: Subdirectories inside the cache directory.
+
+    Returns:
+        The path of the directory.
+    """
+    base = os.environ.get(CACHE_ENV, os.path.join(os.path.expanduser("~"), ".cache",
+                                                  "dicom_viewer"))
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+
+    return path
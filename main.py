@@ -8,4 +8,5 @@ def main():
     contr.start()
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,22 @@ is a set of transformations to the data.
 
 """
 
-from typing import List, Union
+from typing import List, Optional, Tuple, Union
+import os
+import threading
 from pydicom.filereader import dcmread
 import numpy as np
 import cv2
 import functions as funcs
+from model import mpr, pixel_backends, series, tiles
+from model.projection import SlabProjector
+from model.frame_cache import FrameCache, DEFAULT_BUDGET
+from model.windowing import Windowing, apply_window
+from model.histogram import HistogramCache, VOLUME
+from model.statistics import VolumeStatistics
+from model.pipeline import RenderPipeline, Stage
+from model.profiling import PROFILER
+from model.pyramid import ImagePyramid
 
 Num = Union[int, float]
 
@@ -19,48 +30,177 @@ class DicomImage:
     """
     Wrapper class for the pydicom library.
 
-    The DicomImage is an iterable object though the different 3D channels
+    The DicomImage is an iterable object though the different 3D channels. The frames are
+    decoded on demand and kept on a LRU cache limited by cache_size bytes.
+
+    The slices can be of the axial plane, the frames of the file, or of the coronal and sagittal
+    planes, see mpr. The whole volume is loaded the first time a reformatted plane is shown, and
+    its slices are views of it. The pixels are shown with the aspect ratio of the voxels.
+
+    Each slice is rendered from the level of its pyramid closest to the scale it's shown at, see
+    pyramid, so the big images are reduced cheaply and the zoom shows their full resolution. With
+    zoom the view can also be rendered in tiles, see render_tiles.
+
+    Instead of single slices the projection of thick slabs, centered on each slice, can be shown,
+    see projection.
 
     """
 
-    def __init__(self, path: str, max_size: List[Num] = None):
+    def __init__(self, path: str, max_size: List[Num] = None, cache_size: int = DEFAULT_BUDGET,
+                 series_uid: str = None, index=None, files: List[str] = None,
+                 workers: int = None, volume: np.ndarray = None):
+        """ Opens a Dicom file or a directory with a series of Dicom files.
+
+        Args:
+            path (str): Path of a file or of a directory, with one slice per file.
+            max_size (List[Num]): Maximum size of the images rendered.
+            cache_size (int): Bytes of the cache of decoded frames.
+            series_uid (str): Series to open if the directory has more than one, by default the
+                series with more slices.
+            index (DicomIndex): Index used to find the files of a series.
+            files (List[str]): Sorted files of the series of the directory, if they are already
+                known the directory isn't scanned.
+            workers (int): Processes decoding the volume of the compressed multiframe files, by
+                default the number of cores.
+            volume (np.ndarray): Volume already decoded, for instance by another process and
+                mapped from a .npy file, used instead of decoding it again.
+        """
         self.__path = path
-        self.__dicom_file = dcmread(path)
+        if os.path.isdir(path):
+            if files is not None:
+                self.__backend = series.SeriesBackend(files)
+            else:
+                self.__backend = series.load_series(path, series_uid, index=index)
+            self.__dicom_file = self.__backend.header
+            self.__header_path = self.__backend.paths[0]
+        else:
+            self.__dicom_file = dcmread(path, defer_size=pixel_backends.DEFER_SIZE)
+            self.__backend = pixel_backends.select_backend(self.__dicom_file, workers)
+            self.__header_path = path
+        self.__cache_size = cache_size
+        self.__cache = FrameCache(cache_size)
+        self.__tiles = FrameCache(tiles.TILE_BUDGET)
+        self.__closed = threading.Event()
+        self.__statistics = VolumeStatistics(
+            path, self.__get_frames, len(self.__backend),
+            files=self.__backend.paths if os.path.isdir(path) else None,
+            scan_frames=self.__scan_frames)
+        self.__histograms = HistogramCache(self.__statistics)
         self.__zoom_factor = 1
         self.__position = [0, 0]
 
         self.__contrast = [0, 1]
+        self.__windowing = Windowing(self.__dicom_file)
+        self.__window = None
+        if self.__windowing.presets:
+            self.__window = self.__windowing.presets[0]
 
         if max_size is None:
             max_size = [float('inf'), float('inf')]
         self.__max_size = max_size
-        self.__real_size = None
-        self.__reduced_size = None
+
+        self.__plane = mpr.AXIAL
+        self.__spacing = mpr.voxel_spacing(self.__dicom_file)
+        self.__volume = volume
+        self.__volume_lock = threading.Lock()
+
+        self.__projection = None
+        self.__projector = None
+
+        self.__pipeline = RenderPipeline([
+            Stage("decode", lambda _, item, plane, projection: self.__get_source_image(
+                item, plane, projection), ["item", "plane", "projection"]),
+            Stage("pyramid", lambda img: ImagePyramid(img), []),
+            Stage("zoom", DicomImage.__set_zoom, ["size", "zoom", "position"]),
+            Stage("window", apply_window, ["low", "high"])])
 
     @property
     def images(self) -> np.ndarray:
         """ Returns the images of the Dicom fIle
 
+        Decodes all the frames, use the [item] interface to access a single slice.
+
         Returns:
 
         """
-        return self.__dicom_file.pixel_array
+        return self.__backend.volume()
+
+    @property
+    def header_path(self) -> str:
+        """ Path of the file whose header is returned by get_header. """
+        return self.__header_path
+
+    @property
+    def backend(self) -> str:
+        """ Name of the backend used to read the pixels (memmap, native or pydicom). """
+        return self.__backend.name
+
+    @property
+    def cache_info(self) -> dict:
+        """ Hits, misses and memory usage of the frame cache. """
+        return self.__cache.stats()
+
+    def set_cache_size(self, size: int):
+        self.__cache_size = size
+        self.__cache.max_bytes = self.__frames_budget()
+
+    def __frames_budget(self) -> int:
+        """ Bytes of the cache left for the frames, a decoded volume is charged against it.  """
+        volume = self.__volume
+        if volume is None or self.__backend.volume_is_view or isinstance(volume, np.memmap):
+            return self.__cache_size
+
+        return max(self.__cache_size - volume.nbytes, 0)
 
     def set_max_size(self, size):
         self.__max_size = size
 
-    def minimum_value(self, item: int) -> Num:
-        return self.__get_raw_image(item).min()
+    @property
+    def statistics(self) -> VolumeStatistics:
+        return self.__statistics
+
+    def compute_statistics(self):
+        """ Computes the statistics of all the slices and of the volume, if not loaded.
 
-    def maximum_value(self, item: int) -> Num:
-        return self.__get_raw_image(item).max()
+        Makes a pass over all the volume, it's meant to be called on a background thread. The
+        frames decoded by the pass aren't kept on the frame cache, and close() stops it.
+        """
+        if not self.__statistics.complete:
+            self.__statistics.compute()
+
+    def close(self):
+        """ Stops the work in background on the image, it isn't going to be shown anymore. """
+        self.__closed.set()
+        self.__statistics.cancel()
+
+    def minimum_value(self, item: int = None) -> Num:
+        """ Minimum stored value of a slice, or of the volume if item is None. """
+        return self.__statistics.minimum(item)
+
+    def maximum_value(self, item: int = None) -> Num:
+        """ Maximum stored value of a slice, or of the volume if item is None. """
+        return self.__statistics.maximum(item)
+
+    def auto_window(self, item: int = None, low: int = 1, high: int = 99):
+        """ Sets the window between two percentiles of a slice or of the volume.
+
+        Args:
+            item (int): Index of the slice, if None the percentiles of the volume are used.
+            low (int): Percentile mapped to black, one of statistics.PERCENTILES.
+            high (int): Percentile mapped to white, one of statistics.PERCENTILES.
+        """
+        windowing = self.__windowing
+        low = windowing.to_modality(self.__statistics.percentile(low, item))
+        high = windowing.to_modality(self.__statistics.percentile(high, item))
+
+        self.window = ((low + high) / 2, max(abs(high - low), 1))
 
     def __iter__(self):
         self.__idx = 0
         return self
 
     def __next__(self):
-        if self.__idx <= len(self):
+        if self.__idx < len(self):
             result = self[self.__idx]
             self.__idx += 1
             return result
@@ -82,6 +222,75 @@ class DicomImage:
     @contrast.setter
     def contrast(self, value: List[int]):
         self.__contrast = value
+        self.__window = None
+
+    @property
+    def window(self) -> Optional[Tuple[float, float]]:
+        """ Center and width of the window, in modality units, or None to use the contrast. """
+        return self.__window
+
+    @window.setter
+    def window(self, value: Tuple[float, float]):
+        self.__window = None if value is None else tuple(value)
+
+    def contrast_of_window(self, item: int) -> List[float]:
+        """ Window applied to a slice as fractions of the range of its histogram.
+
+        Without a window the fractions are the contrast, so the lines over the histogram can
+        always be placed where the window applied is.
+
+        Args:
+            item (int): Index of the slice.
+
+        Returns:
+            List with the fractions of the lower and the upper limit, between 0 and 1.
+        """
+        if self.__window is None:
+            return list(self.__contrast)
+
+        if self.__plane != mpr.AXIAL or self.__projection is not None:
+            item = None
+        minimum, maximum = self.__statistics.value_range(item)
+        low, high = self.__windowing.stored_window(*self.__window)
+        width = max(maximum - minimum, 1e-6)
+
+        return [float(np.clip((value - minimum) / width, 0, 1)) for value in (low, high)]
+
+    @property
+    def window_presets(self) -> List[Tuple[float, float]]:
+        """ Windows (center, width) defined on the Dicom file. """
+        return self.__windowing.presets
+
+    @property
+    def plane(self) -> str:
+        """ Plane of the slices, one of mpr.PLANES.  """
+        return self.__plane
+
+    @plane.setter
+    def plane(self, value: str):
+        mpr.check_plane(value)
+        self.__plane = value
+        self.__position = [0, 0]
+
+    @property
+    def projection(self) -> Optional[Tuple[str, int]]:
+        """ Projection (mode, thickness in slices) of the slabs shown, None for single slices.
+
+        The mode is one of projection.MIP, MINIP or AVGIP.
+        """
+        return self.__projection
+
+    @projection.setter
+    def projection(self, value: Optional[Tuple[str, int]]):
+        if value is not None:
+            mode, thickness = value
+            value = (mode, int(thickness)) if int(thickness) > 1 else None
+        self.__projection = value
+
+    @property
+    def spacing(self) -> Tuple[float, float]:
+        """ Size in mm, (rows, columns), of the pixels of the slices of the current plane.  """
+        return mpr.pixel_spacing(self.__spacing, self.__plane)
 
     @property
     def position(self):
@@ -92,7 +301,11 @@ class DicomImage:
         self.__position = value
 
     def __len__(self):
-        return self.images.shape[2]
+        return mpr.n_slices(self.__volume_shape, self.__plane)
+
+    @property
+    def __volume_shape(self) -> Tuple[int, ...]:
+        return (len(self.__backend),) + tuple(self.__backend.frame_shape)
 
     def __getitem__(self, item):
         """ Magic method to use the class with the interface [item].
@@ -103,51 +316,188 @@ class DicomImage:
         Returns:
 
         """
-        img = self.__get_img(item)
+        img = self.__pipeline.render(**self.__render_params(item))
 
         return img
 
-    def __get_img(self, item, flag_contrast: bool = True, flag_zoom: bool = True):
-        img = self.__dicom_file.pixel_array[item, :, :]
+    @property
+    def stage_timings(self) -> dict:
+        """ Calls, last and mean time of each stage of the render of [item].  """
+        return self.__pipeline.timings()
 
-        size = None
-        if self.__real_size is None:
-            self.__real_size = img.shape[::-1]
+    def render(self, item: int, contrast: List[Num] = None, zoom: Num = None,
+               position: List[int] = None, window: Tuple[float, float] = None,
+               plane: str = None, projection=False) -> np.ndarray:
+        """ Renders a slice with the parameters passed, the ones not passed are the current ones.
 
-        if self.__reduced_size is None:
-            if img.shape[0] > self.__max_size[0] or img.shape[1] > self.__max_size[1]:
-                max_idx = np.argmax(img.shape)
-                min_idx = np.argmin(img.shape)
+        Doesn't modify the state of the image, so it can be called from other threads to render
+        slices in advance.
 
-                rel = img.shape[min_idx] / img.shape[max_idx]
+        Args:
+            item (int): Index of the slice.
+            contrast (List[Num]): Minimum and maximum of the contrast window.
+            zoom (Num): Zoom factor.
+            position (List[int]): Position of the zoom.
+            window (Tuple[float, float]): Center and width of the window, has priority over the
+                contrast. If neither of them is passed the current ones are used.
+            plane (str): Plane of the slice, one of mpr.PLANES.
+            projection (Tuple[str, int]): Projection of the slab, None for a single slice.
 
-                max_val = self.__max_size[max_idx]
-                min_val = int(rel * max_val)
+        Returns:
 
-                size = np.zeros(2, dtype=int)
+        """
+        return self.__get_img(item, contrast=contrast, zoom=zoom, position=position,
+                              window=window, plane=plane, projection=projection)
 
-                size[max_idx] = max_val
-                size[min_idx] = min_val
+    def render_tiles(self, item: int, known=frozenset(),
+                     tile_size: int = tiles.TILE_SIZE) -> tiles.TileSet:
+        """ Renders the view of a slice, with the current parameters, in tiles.
 
-                size = tuple(size[::-1])
-                self.__reduced_size = size
-        else:
-            size = self.__reduced_size
+        The zoomed slice is split in tiles of tile_size pixels and only the ones visible are
+        rendered. The tiles are resampled from the pyramid of the slice and kept on a cache, and
+        each one is windowed on its own. The tiles already shown by the view aren't rendered.
+
+        Args:
+            item (int): Index of the slice.
+            known: Keys of the tiles the view already shows.
+            tile_size (int): Side of the tiles, in pixels.
+
+        Returns:
+            TileSet with the position of the visible tiles and the images of the new ones.
+        """
+        with PROFILER.timer("stage.tiles"):
+            params = self.__render_params(item)
+            pyramid = self.__pipeline.render(stop="pyramid", **params)
+
+            size, zoom = params["size"], max(params["zoom"], 1)
+            shown = np.array(size[::-1], dtype=np.float64)
+            zoomed = np.rint(shown * zoom).astype(int)
+            origin = DicomImage.__zoom_origin(shown, zoom, params["position"])
+            corner = np.clip(np.rint(origin * zoom).astype(int), 0, zoomed - shown.astype(int))
+
+            scale = shown * zoom / pyramid.shape[:2]
+            source = (item, params["plane"], params["projection"], tuple(size), zoom)
+            positions, images = {}, {}
+            for tile in tiles.visible_tiles(zoomed, corner, shown, tile_size):
+                top_left = np.array(tile) * tile_size
+                key = source + (tile, params["low"], params["high"])
+                positions[key] = tuple(int(value) for value in top_left - corner)
+                if key in known:
+                    continue
+
+                img = self.__tiles.get(source + (tile_size, tile), lambda: pyramid.render(
+                    scale, top_left, tiles.tile_shape(zoomed, tile, tile_size)))
+                images[key] = apply_window(img, params["low"], params["high"])
+
+        return tiles.TileSet(tuple(int(value) for value in shown), positions, images)
+
+    def render_key(self, item: int) -> tuple:
+        """ Key that identifies the image rendered by [item] with the current parameters.
+
+        Args:
+            item (int): Index of the slice.
+
+        Returns:
+            Tuple of the slice, contrast, zoom, position, window, plane and projection.
+        """
+        return (item, tuple(self.__contrast), self.__zoom_factor, tuple(self.__position),
+                self.__window, self.__plane, self.__projection)
 
-        if size is not None:
-            img = cv2.resize(img, size)
+    def __render_params(self, item, contrast: List[Num] = None, zoom: Num = None,
+                        position: List[int] = None, window: Tuple[float, float] = None,
+                        plane: str = None, projection=False) -> dict:
+        """ Parameters of the stages of the render pipeline.
 
-        if flag_contrast:
-            img = DicomImage.__set_contrast(img, self.__contrast)
-        if flag_zoom and self.__zoom_factor > 1:
-            img = DicomImage.__set_zoom(img, self.__zoom_factor, self.position)
+        The contrast and the window are converted to the stored values mapped to black and
+        white, the rescale of the values is done by the lookup table of the window.
+        """
+        if contrast is None:
+            contrast = self.__contrast
+            window = self.__window if window is None else window
+        if zoom is None:
+            zoom = self.__zoom_factor
+        if position is None:
+            position = self.__position
+        if plane is None:
+            plane = self.__plane
+        if projection is False:
+            projection = self.__projection
+
+        low, high = self.__window_bounds(item, contrast, window,
+                                         plane == mpr.AXIAL and projection is None)
+
+        return {"item": item, "plane": plane, "projection": projection,
+                "size": self.__sizes(plane)[1], "low": low, "high": high, "zoom": zoom,
+                "position": tuple(position)}
+
+    def __get_img(self, item, contrast: List[Num] = None, zoom: Num = None,
+                  position: List[int] = None, window: Tuple[float, float] = None,
+                  plane: str = None, projection=False):
+        """ Runs all the stages of the render, without using the cached intermediate images.  """
+        params = self.__render_params(item, contrast, zoom, position, window, plane,
+                                      projection)
+
+        img = None
+        for stage in self.__pipeline.stages:
+            with PROFILER.timer("stage." + stage.name):
+                img = stage.function(img, **{name: params[name] for name in stage.params})
 
         return img
 
-    def get_histogram(self, item: int):
-        img = self.__get_raw_image(item)
+    def __sizes(self, plane: str = None) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """ Size (width, height) of the slices of a plane and size they are shown at.
+
+        The slices are stretched to the aspect ratio of their pixels and then reduced, keeping
+        the aspect ratio, to fit on max_size.
+
+        Args:
+            plane (str): Plane of the slices, by default the current one.
+
+        Returns:
+            Tuple with the size of the slices and the size shown.
+        """
+        shape = mpr.slice_shape(self.__volume_shape, plane or self.__plane)
+        row_spacing, column_spacing = mpr.pixel_spacing(self.__spacing, plane or self.__plane)
+
+        height, width = shape[:2]
+        unit = min(row_spacing, column_spacing)
+        shown_width, shown_height = width * column_spacing / unit, height * row_spacing / unit
+
+        scale = min(1, self.__max_size[0] / shown_width, self.__max_size[1] / shown_height)
+        shown = (max(int(round(shown_width * scale)), 1),
+                 max(int(round(shown_height * scale)), 1))
+
+        return (width, height), shown
+
+    def __fit_size(self, plane: str = None):
+        """ Size (width, height) the slices are shown at, see __sizes.
+
+        Returns:
+            The size or None if the slices are shown at their size.
+        """
+        real_size, size = self.__sizes(plane)
+
+        return None if size == real_size else size
+
+    def get_histogram(self, item: int, size=funcs.HISTOGRAM_SIZE, volume: bool = False):
+        """ Image of the histogram of a slice.
+
+        The counts of each slice are computed only once.
+
+        Args:
+            item (int): Index of the slice.
+            size: Width and height of the image of the histogram.
+            volume (bool): If true the histogram is of all the slices of the volume, always
+                the case on the coronal and sagittal planes and with projections.
+
+        Returns:
+            RGB image of the histogram.
+        """
+        if volume or self.__plane != mpr.AXIAL or self.__projection is not None:
+            item = VOLUME
 
-        return funcs.get_histogram(img)
+        with PROFILER.timer("stage.histogram"):
+            return self.__histograms.image(item, size)
 
     def get_distance(self, point_1, point_2) -> float:
         """ Calculate the distance between two points.
@@ -162,9 +512,9 @@ class DicomImage:
         point_1 = point_1 / self.__zoom_factor
         point_2 = point_2 / self.__zoom_factor
 
-        if self.__reduced_size is not None:
-            rel = self.__real_size[0] / self.__reduced_size[0], self.__real_size[1] / \
-                  self.__reduced_size[1]
+        real_size, reduced_size = self.__sizes()
+        if reduced_size != real_size:
+            rel = real_size[0] / reduced_size[0], real_size[1] / reduced_size[1]
             point_1 = np.multiply(point_1, rel)
             point_2 = np.multiply(point_2, rel)
 
@@ -173,82 +523,207 @@ class DicomImage:
         return distance
 
     def get_pixel(self, x, y, z):
-        img = self.__get_img(z, flag_contrast=False, flag_zoom=True)
+        probed = self.probe(x, y, z)
 
-        return img[y][x]
+        return None if probed is None else probed[0]
 
-    def __get_raw_image(self, item):
-        return self.__dicom_file.pixel_array[:, :, item]
-
-    @staticmethod
-    def __set_zoom(img: np.ndarray, zoom: Num, position: List[int]):
-        """ Renders and image with zoom and it's position
+    def probe(self, x: int, y: int, z: int) -> Optional[Tuple[Num, float]]:
+        """ Value of the pixel shown on a position of the view.
 
-        This function apply zoom to an image. The zoom is aplied in two steps. Fist of all the
-        image is resized to the size passed as parameter. Secondly the resized image is cropped
-        to the original size. Doing this we accomplish a zoom effect. To move the zoom position
-        we add a the value to the initial crop position.
+        The position is mapped analytically to the raw slice through the zoom, the position of
+        the zoom and the reduction to max_size, no image is rendered. The slice is the one kept
+        by the decode stage of the render pipeline. If it isn't there only the axial slices, and
+        the ones of a volume already loaded, are read, the projections aren't computed.
 
         Args:
-            img (np.ndarray): Image to make the zoom
-            zoom (Number):
-            position:
+            x (int): Column on the view.
+            y (int): Row on the view.
+            z (int): Index of the slice.
 
         Returns:
-
+            Tuple with the stored value and the value rescaled to modality units (HU on CT), or
+            None if the slice isn't available yet. The pixels of several samples, as RGB, are
+            returned as tuples without rescale.
+        """
+        shape = np.array(mpr.slice_shape(self.__volume_shape, self.__plane)[:2])
+        size = self.__fit_size()
+        view_shape = shape if size is None else np.array(size[::-1])
+
+        point = np.array([y, x], dtype=np.float64) + 0.5
+        if self.__zoom_factor > 1:
+            point = DicomImage.__zoom_origin(view_shape, self.__zoom_factor, self.__position) + \
+                    point / self.__zoom_factor
+        point = point * shape / view_shape
+
+        source = self.__pipeline.cached("decode", item=z, plane=self.__plane,
+                                        projection=self.__projection)
+        if source is None:
+            if self.__projection is not None or \
+                    (self.__plane != mpr.AXIAL and self.__volume is None):
+                return None
+            source = self.__get_raw_image(z, self.__plane)
+
+        row, column = np.clip(point.astype(int), 0, shape - 1)
+        value = source[row, column]
+        if np.ndim(value):
+            value = tuple(value.tolist())
+            return value, value
+
+        return value, self.__windowing.to_modality(float(value))
+
+    def __get_raw_image(self, item, plane: str = mpr.AXIAL):
+        if plane != mpr.AXIAL:
+            if not 0 <= item < mpr.n_slices(self.__volume_shape, plane):
+                raise IndexError(f"Slice {item} out of range of the {plane} plane")
+            return mpr.plane_slice(self.__get_volume(), plane, item)
+
+        if not self.__backend.cacheable:
+            return self.__backend.get_frame(item)
+        return self.__cache.get(item, lambda: self.__backend.get_frame(item))
+
+    def __get_frames(self, start: int, stop: int) -> np.ndarray:
+        """ Consecutive frames of the file, decoded one by one through the frame cache.  """
+        if not self.__backend.cacheable:
+            return self.__backend.get_frames(start, stop)
+
+        return np.stack([self.__get_raw_image(item)
+                         for item in range(start, min(stop, len(self.__backend)))])
+
+    def __scan_frames(self, start: int, stop: int) -> np.ndarray:
+        """ Consecutive frames for the pass over the volume, without filling the frame cache.
+
+        The frames already cached are reused, the other ones are decoded and dropped, so the
+        pass doesn't evict the frames being viewed. If the image is closed it stops decoding,
+        and fewer frames are returned.
         """
-        assert zoom > 1
+        if not self.__backend.cacheable:
+            return self.__backend.get_frames(start, stop)
+
+        frames = []
+        for item in range(start, min(stop, len(self.__backend))):
+            if frames and self.__closed.is_set():
+                break
+            frame = self.__cache.peek(item)
+            frames.append(self.__backend.get_frame(item) if frame is None else frame)
+
+        return np.stack(frames)
+
+    def __get_source_image(self, item, plane: str, projection) -> np.ndarray:
+        """ Slice, or projection of the slab centered on it, with the stored values.  """
+        if projection is None:
+            return self.__get_raw_image(item, plane)
+
+        return self.__get_projector(plane, *projection).project(item)
+
+    def __get_projector(self, plane: str, mode: str, thickness: int) -> SlabProjector:
+        """ Projector of the slabs of a plane, the one of the last slabs shown is kept.  """
+        projector = self.__projector
+        if projector is None or projector[0] != (plane, mode, thickness):
+            if plane == mpr.AXIAL:
+                get_slices = self.__get_frames
+            else:
+                def get_slices(start, stop):
+                    return mpr.plane_slices(self.__get_volume(), plane, start, stop)
+
+            projector = ((plane, mode, thickness),
+                         SlabProjector(get_slices, mpr.n_slices(self.__volume_shape, plane),
+                                       mode, thickness))
+            self.__projector = projector
+
+        return projector[1]
+
+    def get_volume(self) -> np.ndarray:
+        """ Volume of shape (frames, rows, columns) with the stored values, decoded once.  """
+        return self.__get_volume()
+
+    def __get_volume(self) -> np.ndarray:
+        """ Volume of the reformatted planes, loaded once.  """
+        with self.__volume_lock:
+            if self.__volume is None:
+                self.__volume = self.__backend.volume()
+                self.__cache.max_bytes = self.__frames_budget()
+
+        return self.__volume
 
-        original_size = np.array(img.shape)
-        new_size = original_size * zoom
+    @staticmethod
+    def __zoom_origin(shape, zoom: Num, position: List[int]) -> np.ndarray:
+        """ Top left corner, in coordinates of the image, of the region visible with the zoom.
 
-        img_resized = cv2.resize(img, tuple(new_size[::-1]))
-        position = position
+        The position is expressed in pixels of the zoomed image, it's clamped so the visible
+        region is always inside the image.
 
-        position[0] = max(position[0], 0)
-        position[1] = max(position[1], 0)
+        Args:
+            shape: Shape of the image without zoom.
+            zoom (Number): Zoom factor.
+            position: Position of the zoom, (row, column).
 
-        img = img_resized[position[0]:original_size[0] + position[0],
-              position[1]:original_size[1] + position[1]]
+        Returns:
+            Array with the row and the column, can be fractional.
+        """
+        size = np.array(shape[:2], dtype=np.float64)
+        position = np.clip(np.asarray(position, dtype=np.float64), 0, size * (zoom - 1))
 
-        return img
+        return position / zoom
 
     @staticmethod
-    def __set_contrast(img: np.ndarray, contrast: List[Num]):
-        """ Change the contrast of the image.
+    def __set_zoom(pyramid: ImagePyramid, size: Tuple[int, int], zoom: Num,
+                   position: List[int]) -> np.ndarray:
+        """ Renders the region of the slice visible with the zoom at the size it's shown.
 
-        The contrast of an image can be set through a numericall transformation.
+        The region is resampled from the level of the pyramid closest to the resolution shown,
+        see ImagePyramid.render, so the memory and the time don't depend on the zoom factor nor
+        on the size of the slice. Without zoom the whole level is reduced averaging areas.
 
         Args:
-            img:
-            contrast:
+            pyramid (ImagePyramid): Pyramid of the slice.
+            size (Tuple[int, int]): Size (width, height) the slice is shown at without zoom.
+            zoom (Number): Zoom factor, 1 or less shows the whole slice.
+            position: Position of the zoom in pixels of the zoomed image, (row, column).
 
         Returns:
-
+            Image of the size shown.
         """
-        assert max(contrast) <= 1 and min(contrast) >= 0
-
-        img_c = np.copy(img)
-        img_c = img_c.astype(np.float)
-
-        adder = abs(int(min(0, img.min())))
+        shown = np.array(size[::-1], dtype=np.float64)
+        if zoom > 1:
+            origin = DicomImage.__zoom_origin(shown, zoom, position)
+            return pyramid.render(shown * zoom / pyramid.shape[:2], origin * zoom, size[::-1])
+
+        level = pyramid.level(pyramid.level_for(max(shown / pyramid.shape[:2])))
+        shape = np.array(level.shape[:2])
+        if tuple(shape) == tuple(size[::-1]):
+            return level
+
+        shrink = (shape > shown).all()
+        return cv2.resize(np.ascontiguousarray(level), tuple(size),
+                          interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+
+    def __window_bounds(self, item: int, contrast: List[Num], window,
+                        slice_statistics: bool = True) -> Tuple[float, float]:
+        """ Stored values mapped to black and white by the contrast.
+
+        If a window, in modality units, is defined it's used, otherwise the window is the
+        fraction of the values of the slice defined by the contrast. The window is applied
+        through a lookup table, see windowing.apply_window. The statistics are only kept for
+        the axial slices, on the other planes and the projections the values of the volume are
+        used.
 
-        maximum_value = (img.max() + adder) * max(contrast)
-        minimum_value = (img.max() + adder) * min(contrast)
-
-        maximum_value -= adder
-        minimum_value -= adder
-
-        reverse_selection = ((img > minimum_value) & (img < maximum_value))
-        img_c[reverse_selection] = (img_c[reverse_selection] - minimum_value) / (
-                maximum_value - minimum_value)
+        Args:
+            item: Index of the slice.
+            contrast: Minimum and maximum of the contrast, between 0 and 1.
+            window: Center and width of the window or None.
+            slice_statistics: If false the values of the volume are used.
 
-        img_c[img >= maximum_value] = 1
-        img_c[img <= minimum_value] = 0
+        Returns:
+            Tuple with the lower and upper stored values.
+        """
+        if window is not None:
+            return self.__windowing.stored_window(*window)
 
-        img_c = img_c * 255
+        if not slice_statistics:
+            item = None
 
-        return img_c
+        return Windowing.contrast_window(contrast, self.minimum_value(item),
+                                         self.maximum_value(item))
 
     def get_header(self):
         """ Get a header element
@@ -266,4 +741,9 @@ class DicomImage:
                 pass
 
     def move_image(self, differential):
-        self.position += differential[::-1] // 2
+        position = np.maximum(self.position + differential[::-1] // 2, 0)
+
+        size = self.__sizes()[1]
+        position = np.minimum(position, np.array(size[::-1]) * (self.__zoom_factor - 1))
+
+        self.position = position
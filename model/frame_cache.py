@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+""" LRU cache of decoded frames.
+
+The cache is bounded by the number of bytes of the frames it holds, not by the number of
+frames, so the same budget works for small MR slices and for big mammography frames.
+
+"""
+
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+import threading
+
+import numpy as np
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+
+
+class FrameCache:
+    """
+    Least recently used cache of numpy arrays with a memory budget.
+
+    The cache is thread-safe, several workers can ask for frames at the same time.
+
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET):
+        self.__max_bytes = max_bytes
+        self.__frames = OrderedDict()
+        self.__nbytes = 0
+        self.__lock = threading.RLock()
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        with self.__lock:
+            self.__max_bytes = value
+            self.__evict()
+
+    @property
+    def nbytes(self) -> int:
+        return self.__nbytes
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+    def __len__(self):
+        return len(self.__frames)
+
+    def __contains__(self, key: Hashable):
+        return key in self.__frames
+
+    def get(self, key: Hashable, loader: Callable[[], np.ndarray]) -> np.ndarray:
+        """ Get a frame from the cache, loading it if it's not there.
+
+        Args:
+            key: Identifier of the frame.
+            loader: Function without parameters that decodes the frame.
+
+        Returns:
+            The decoded frame.
+        """
+        with self.__lock:
+            if key in self.__frames:
+                self.__hits += 1
+                self.__frames.move_to_end(key)
+                return self.__frames[key]
+            self.__misses += 1
+
+        frame = loader()
+        self.put(key, frame)
+
+        return frame
+
+    def peek(self, key: Hashable) -> Optional[np.ndarray]:
+        """ Frame of the cache or None, without counting it nor marking it as recently used. """
+        with self.__lock:
+            return self.__frames.get(key)
+
+    def put(self, key: Hashable, frame: np.ndarray):
+        """ Stores a frame already decoded.
+
+        Args:
+            key: Identifier of the frame.
+            frame (np.ndarray): The frame.
+        """
+        with self.__lock:
+            if key not in self.__frames:
+                self.__frames[key] = frame
+                self.__nbytes += frame.nbytes
+                self.__evict()
+
+    def clear(self):
+        with self.__lock:
+            self.__frames.clear()
+            self.__nbytes = 0
+
+    def stats(self) -> dict:
+        """ Counters of the cache.
+
+        Returns:
+            Dictionary with the hits, misses, evictions, number of frames and bytes used.
+        """
+        return {"hits": self.__hits, "misses": self.__misses, "evictions": self.__evictions,
+                "frames": len(self.__frames), "bytes": self.__nbytes,
+                "max_bytes": self.__max_bytes}
+
+    def __evict(self):
+        """ Removes the least recently used frames until the cache fits on the budget.
+
+        The last frame inserted is never removed, a frame bigger than the budget is still
+        returned to the caller.
+        """
+        while self.__nbytes > self.__max_bytes and len(self.__frames) > 1:
+            _, frame = self.__frames.popitem(last=False)
+            self.__nbytes -= frame.nbytes
+            self.__evictions += 1
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+""" Header of a Dicom file as a lazily expanded tree.
+
+The file is parsed without the pixel data and with the large values deferred, and the elements
+are only converted when they are shown. The large values show only their beginning and size,
+they are read in full when their node is opened, and the items of the sequences are only
+parsed when the sequence is opened.
+
+"""
+
+from typing import Callable, List, Optional, Union
+
+from pydicom.datadict import dictionary_VR
+from pydicom.dataset import Dataset
+from pydicom.filereader import dcmread
+
+from model import pixel_backends
+from model.tag_lookup import tag_name
+
+MAX_VALUE_LENGTH = 1024
+MAX_CHARS = 200
+
+
+def read_header(path: str) -> Dataset:
+    """ Parses a file without the pixel data and with the large values deferred. """
+    return dcmread(path, stop_before_pixels=True, defer_size=pixel_backends.DEFER_SIZE)
+
+
+def _element_vr(element) -> Optional[str]:
+    if element.VR is not None:
+        return element.VR
+    try:
+        return dictionary_VR(element.tag)
+    except KeyError:
+        return None
+
+
+class HeaderNode:
+    """
+    Row of the header tree, an element of a dataset or an item of a sequence.
+
+    The value can be a function, called the first time the value is shown.
+
+    """
+
+    def __init__(self, label: str, tag: str, vr: str, value: Union[str, Callable[[], str]],
+                 depth: int, load_children: Callable[[], List["HeaderNode"]] = None):
+        self.label = label
+        self.tag = tag
+        self.vr = vr
+        self.depth = depth
+        self.__value = value
+
+        self.expanded = False
+        self.__load_children = load_children
+        self.__children = None
+
+    @property
+    def value(self) -> str:
+        if callable(self.__value):
+            self.__value = self.__value()
+
+        return self.__value
+
+    @value.setter
+    def value(self, value: str):
+        self.__value = value
+
+    @property
+    def expandable(self) -> bool:
+        return self.__load_children is not None
+
+    @property
+    def children(self) -> List["HeaderNode"]:
+        """ Nodes of the sequence or of the item, loaded the first time.  """
+        if self.__children is None:
+            self.__children = self.__load_children() if self.expandable else []
+
+        return self.__children
+
+
+def dataset_nodes(dataset: Dataset, depth: int = 0) -> List[HeaderNode]:
+    """ Nodes of the elements of a dataset.
+
+    The elements are read as they were parsed, so the values aren't converted unless they are
+    small enough to be shown. The nodes of the large values show a preview, opening them adds
+    the whole value split in rows.
+
+    Args:
+        dataset (Dataset): Dataset or item of a sequence.
+        depth (int): Depth of the nodes on the tree.
+
+    Returns:
+
+    """
+    nodes = []
+    for element in dataset.values():
+        tag = f"({element.tag.group:04X},{element.tag.element:04X})"
+        vr = _element_vr(element)
+        label = tag_name(tag)
+
+        if vr == "SQ":
+            nodes.append(HeaderNode(label, tag, vr, "Seqüència", depth,
+                                    _sequence_loader(dataset, element.tag, depth + 1)))
+            continue
+
+        length = getattr(element, "length", None)
+        if length is None and isinstance(element.value, (bytes, bytearray)):
+            length = len(element.value)
+        if (element.value is None and length) or (length or 0) > MAX_VALUE_LENGTH:
+            nodes.append(HeaderNode(label, tag, vr or "",
+                                    _preview_loader(dataset, element.tag, length), depth,
+                                    _lines_loader(dataset, element.tag, depth + 1)))
+        else:
+            nodes.append(HeaderNode(label, tag, vr or "", _value_loader(dataset, element.tag),
+                                    depth))
+
+    return nodes
+
+
+def _value_loader(dataset: Dataset, tag) -> Callable[[], str]:
+    return lambda: str(dataset[tag].value)[:MAX_CHARS]
+
+
+def _preview_loader(dataset: Dataset, tag, length: int) -> Callable[[], str]:
+    def load():
+        value = dataset[tag].value
+        if isinstance(value, (bytes, bytearray, str)):
+            value = value[:MAX_CHARS]
+        return f"{str(value)[:MAX_CHARS]}… <{length} bytes>"
+
+    return load
+
+
+def _lines_loader(dataset: Dataset, tag, depth: int) -> Callable[[], List[HeaderNode]]:
+    """ Rows with the whole value of an element, MAX_CHARS characters each one.  """
+    def load():
+        text = str(dataset[tag].value)
+        return [HeaderNode("", "", "", text[start:start + MAX_CHARS], depth)
+                for start in range(0, len(text), MAX_CHARS)]
+
+    return load
+
+
+def _sequence_loader(dataset: Dataset, tag, depth: int) -> Callable[[], List[HeaderNode]]:
+    def load():
+        items = dataset[tag].value
+        return [HeaderNode(f"Element {i + 1}", "", "", "", depth,
+                           lambda item=item: dataset_nodes(item, depth + 1))
+                for i, item in enumerate(items)]
+
+    return load
+
+
+class HeaderTree:
+    """
+    Rows of the header of a Dicom file, with the nodes opened expanded.
+
+    Only the list of visible rows is kept, opening a node inserts its children after it and
+    closing it removes them.
+
+    """
+
+    def __init__(self, dataset: Dataset):
+        self.__rows = dataset_nodes(dataset)
+
+    def __len__(self):
+        return len(self.__rows)
+
+    def node(self, item: int) -> HeaderNode:
+        return self.__rows[item]
+
+    def row(self, item: int) -> list:
+        """ Row shown on the table: name, tag, VR and value.  """
+        node = self.__rows[item]
+        marker = ""
+        if node.expandable:
+            marker = "▾ " if node.expanded else "▸ "
+
+        return ["   " * node.depth + marker + node.label, node.tag, node.vr, node.value]
+
+    def toggle(self, item: int) -> int:
+        """ Opens or closes a node.
+
+        Args:
+            item (int): Index of the row of the node.
+
+        Returns:
+            Number of rows after the change.
+        """
+        node = self.__rows[item]
+        if not node.expandable:
+            return len(self)
+
+        if node.expanded:
+            stop = item + 1
+            while stop < len(self.__rows) and self.__rows[stop].depth > node.depth:
+                stop += 1
+            del self.__rows[item + 1:stop]
+            node.expanded = False
+        else:
+            children = node.children
+            self.__rows[item + 1:item + 1] = children
+            node.expanded = True
+            for child in children:
+                child.expanded = False
+            if node.vr == "SQ":
+                node.value = f"Seqüència ({len(children)} elements)"
+
+        return len(self)
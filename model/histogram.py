@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+""" Histograms of the slices and of the whole volume.
+
+The counts come from the statistics of the volume, computed once per slice, and the images of
+the last histograms drawn are kept. Panning, zooming or changing the contrast don't change the
+histogram so it costs nothing.
+
+"""
+
+from collections import OrderedDict
+from typing import Tuple
+import threading
+
+import numpy as np
+
+import functions as funcs
+from model.statistics import VolumeStatistics
+
+VOLUME = "volume"
+
+
+class HistogramCache:
+    """
+    Counts and images of the histograms of a DicomImage.
+
+    The range of the histogram of a slice goes from min(0, minimum) to the maximum, the same
+    range that the contrast fractions refer to, so the lines drawn over the histogram match the
+    values of the window.
+
+    """
+
+    def __init__(self, statistics: VolumeStatistics, max_images: int = 16):
+        """ Constructor of the cache.
+
+        Args:
+            statistics (VolumeStatistics): Store with the counts of the histograms.
+            max_images (int): Number of images of histograms kept.
+        """
+        self.__statistics = statistics
+        self.__max_images = max_images
+
+        self.__images = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def counts(self, item) -> np.ndarray:
+        """ Counts of the histogram of a slice, or of the volume if item is VOLUME.
+
+        Args:
+            item: Index of the slice or VOLUME.
+
+        Returns:
+            Array with the counts of each bin.
+        """
+        return self.__statistics.histogram(None if item == VOLUME else item)
+
+    def value_range(self, item) -> Tuple[float, float]:
+        """ Minimum and maximum values of the bins of the histogram.  """
+        return self.__statistics.value_range(None if item == VOLUME else item)
+
+    def image(self, item, size: Tuple[int, int] = funcs.HISTOGRAM_SIZE) -> np.ndarray:
+        """ RGB image with the bars of the histogram.
+
+        Args:
+            item: Index of the slice or VOLUME.
+            size (Tuple[int, int]): Width and height of the image.
+
+        Returns:
+            The image.
+        """
+        key = (item, tuple(size))
+        with self.__lock:
+            if key in self.__images:
+                self.__images.move_to_end(key)
+                return self.__images[key]
+
+        img = funcs.draw_histogram(self.counts(item), size)
+
+        with self.__lock:
+            self.__images[key] = img
+            while len(self.__images) > self.__max_images:
+                self.__images.popitem(last=False)
+
+        return img
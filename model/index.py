@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+""" Index of the Dicom files of the folders browsed.
+
+The tags needed to find and sort the files are kept on a SQLite database. A folder is only
+parsed again for the files that changed since the last scan, and the queries are answered
+without reading any Dicom file. The files that aren't Dicom images are recorded too, so they
+aren't parsed again until they change.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import json
+import multiprocessing
+import os
+import sqlite3
+
+import functions as funcs
+from model.series import read_header, sort_headers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    patient_id TEXT,
+    patient_name TEXT,
+    study_uid TEXT,
+    series_uid TEXT,
+    sop_uid TEXT,
+    instance INTEGER,
+    position TEXT,
+    orientation TEXT,
+    rows INTEGER,
+    columns INTEGER,
+    frames INTEGER,
+    transfer_syntax TEXT
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_patient ON files (patient_id);
+CREATE INDEX IF NOT EXISTS files_series ON files (series_uid);
+CREATE TABLE IF NOT EXISTS skipped (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS skipped_directory ON skipped (directory);
+"""
+
+FILE_COLUMNS = ["path", "directory", "mtime", "size", "patient_id", "patient_name", "study_uid",
+                "series_uid", "sop_uid", "instance", "position", "orientation", "rows", "columns",
+                "frames", "transfer_syntax"]
+
+
+def default_path() -> str:
+    return os.path.join(funcs.cache_dir(), "index.sqlite")
+
+
+def _row(header: dict, mtime: int, size: int) -> dict:
+    """ Row of the index of a file, from its header read by series.read_header.
+
+    Args:
+        header (dict): Tags of the file.
+        mtime (int): Modification time, in nanoseconds, of the file.
+        size (int): Size in bytes of the file.
+
+    Returns:
+        Dictionary with the value of each column.
+    """
+    def tag_list(name):
+        value = header[name]
+        return None if value is None else json.dumps(value)
+
+    return {"path": header["path"], "directory": os.path.dirname(header["path"]),
+            "mtime": mtime, "size": size, "patient_id": header["patient_id"],
+            "patient_name": header["patient_name"], "study_uid": header["study"],
+            "series_uid": header["series"], "sop_uid": header["sop"],
+            "instance": header["instance"], "position": tag_list("position"),
+            "orientation": tag_list("orientation"), "rows": header["rows"],
+            "columns": header["columns"], "frames": header["frames"],
+            "transfer_syntax": header["transfer_syntax"]}
+
+
+def _series_header(path, series_uid, position, orientation, instance) -> dict:
+    """ Row of the index with the format of series.read_header. """
+    return {"path": path, "series": series_uid,
+            "position": None if position is None else json.loads(position),
+            "orientation": None if orientation is None else json.loads(orientation),
+            "instance": instance}
+
+
+class DicomIndex:
+    """
+    SQLite index of Dicom files.
+
+    """
+
+    def __init__(self, path: str = None):
+        """ Opens the index, creating the database if it doesn't exist.
+
+        Args:
+            path (str): Path of the database, by default index.sqlite on the cache directory.
+        """
+        if path is None:
+            path = default_path()
+        self.__connection = sqlite3.connect(path)
+        self.__connection.executescript(SCHEMA)
+
+    def close(self):
+        self.__connection.close()
+
+    def scan(self, directory: str, workers: int = None) -> int:
+        """ Updates the index with the files of a directory.
+
+        Only the new files, or the ones with a different modification time or size, are parsed.
+        The files deleted from the directory are removed from the index. The files that aren't
+        Dicom images are kept on the skipped table with their modification time and size.
+
+        Args:
+            directory (str): Path of the directory, subdirectories are not scanned.
+            workers (int): Number of processes parsing the headers.
+
+        Returns:
+            Number of files parsed.
+        """
+        directory = os.path.abspath(directory)
+        on_disk = {}
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                stat = entry.stat()
+                on_disk[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+        indexed = {path: (mtime, size) for path, mtime, size in self.__connection.execute(
+            "SELECT path, mtime, size FROM files WHERE directory = ? UNION ALL "
+            "SELECT path, mtime, size FROM skipped WHERE directory = ?", (directory, directory))}
+
+        removed = [(path,) for path in indexed if path not in on_disk]
+        changed = [(path, mtime, size) for path, (mtime, size) in on_disk.items()
+                   if indexed.get(path) != (mtime, size)]
+
+        paths = [path for path, _, _ in changed]
+        workers = workers or os.cpu_count() or 1
+        if len(changed) > 1 and workers > 1:
+            # Spawned, forking the GUI process while its threads run isn't safe
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                chunksize = max(1, len(changed) // (4 * workers))
+                headers = list(pool.map(read_header, paths, chunksize=chunksize))
+        else:
+            headers = [read_header(path) for path in paths]
+        entries = [None if header is None else _row(header, mtime, size)
+                   for header, (_, mtime, size) in zip(headers, changed)]
+
+        with self.__connection:
+            outdated = removed + [(args[0],) for args in changed]
+            self.__connection.executemany("DELETE FROM files WHERE path = ?", outdated)
+            self.__connection.executemany("DELETE FROM skipped WHERE path = ?", outdated)
+            self.__connection.executemany(
+                f"INSERT INTO files ({', '.join(FILE_COLUMNS)}) VALUES "
+                f"({', '.join('?' * len(FILE_COLUMNS))})",
+                [[row[c] for c in FILE_COLUMNS] for row in entries if row is not None])
+            self.__connection.executemany(
+                "INSERT INTO skipped (path, directory, mtime, size) VALUES (?, ?, ?, ?)",
+                [(path, directory, mtime, size)
+                 for (path, mtime, size), row in zip(changed, entries) if row is None])
+
+        return len(changed)
+
+    def patients(self) -> List[Tuple[str, str]]:
+        """ Identifier and name of the patients indexed. """
+        return self.__connection.execute(
+            "SELECT DISTINCT patient_id, patient_name FROM files ORDER BY patient_name").fetchall()
+
+    def series_for_patient(self, patient_id: str) -> List[Tuple[str, str, int]]:
+        """ Series of a patient.
+
+        Args:
+            patient_id (str): PatientID.
+
+        Returns:
+            List of tuples with the StudyInstanceUID, the SeriesInstanceUID and the number of
+            files.
+        """
+        return self.__connection.execute(
+            "SELECT study_uid, series_uid, COUNT(*) FROM files WHERE patient_id = ? "
+            "GROUP BY study_uid, series_uid ORDER BY study_uid", (patient_id,)).fetchall()
+
+    def series_in_directory(self, directory: str) -> dict:
+        """ Headers of the files of each series of a directory, as series.scan_directory.  """
+        rows = self.__connection.execute(
+            "SELECT path, series_uid, position, orientation, instance FROM files "
+            "WHERE directory = ?", (os.path.abspath(directory),))
+
+        series = {}
+        for row in rows:
+            header = _series_header(*row)
+            series.setdefault(header["series"], []).append(header)
+
+        return {uid: sort_headers(headers) for uid, headers in series.items()}
+
+    def series_slices(self, series_uid: str) -> List[str]:
+        """ Paths of the files of a series, ordered by their position.  """
+        rows = self.__connection.execute(
+            "SELECT path, series_uid, position, orientation, instance FROM files "
+            "WHERE series_uid = ?", (series_uid,))
+        headers = [_series_header(*row) for row in rows]
+
+        return [header["path"] for header in sort_headers(headers)]
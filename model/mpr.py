@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+""" Multiplanar reconstruction of a volume.
+
+The slices of the axial, coronal and sagittal planes are views over the same array of shape
+(slices, rows, columns), no pixel is copied to change the plane. The volume is ordered from the
+first slice of the series, so on the coronal and sagittal planes the slices axis is reversed to
+show the last slice on the top.
+
+"""
+
+from typing import Tuple
+
+import numpy as np
+from pydicom.dataset import Dataset
+
+AXIAL = "axial"
+CORONAL = "coronal"
+SAGITTAL = "sagittal"
+
+PLANES = (AXIAL, CORONAL, SAGITTAL)
+
+
+def check_plane(plane: str):
+    if plane not in PLANES:
+        raise ValueError(f"Unknown plane {plane}, must be one of {', '.join(PLANES)}")
+
+
+def n_slices(shape: Tuple[int, ...], plane: str) -> int:
+    """ Number of slices of a plane of a volume.
+
+    Args:
+        shape: Shape of the volume, (slices, rows, columns).
+        plane (str): One of PLANES.
+
+    Returns:
+
+    """
+    check_plane(plane)
+
+    return shape[PLANES.index(plane)]
+
+
+def slice_shape(shape: Tuple[int, ...], plane: str) -> Tuple[int, ...]:
+    """ Shape of the slices of a plane of a volume of shape (slices, rows, columns). """
+    check_plane(plane)
+    axis = PLANES.index(plane)
+
+    return shape[:axis] + shape[axis + 1:]
+
+
+def plane_slice(volume: np.ndarray, plane: str, item: int) -> np.ndarray:
+    """ Slice of a plane of the volume, as a view of the volume.
+
+    Args:
+        volume (np.ndarray): Array of shape (slices, rows, columns).
+        plane (str): One of PLANES.
+        item (int): Index of the slice on the plane.
+
+    Returns:
+        Strided view, for the coronal and sagittal planes it's not contiguous.
+    """
+    check_plane(plane)
+
+    if plane == AXIAL:
+        return volume[item]
+    if plane == CORONAL:
+        return volume[::-1, item]
+
+    return volume[::-1, :, item]
+
+
+def plane_slices(volume: np.ndarray, plane: str, start: int, stop: int) -> np.ndarray:
+    """ Consecutive slices of a plane of the volume, as a view of the volume.
+
+    Args:
+        volume (np.ndarray): Array of shape (slices, rows, columns).
+        plane (str): One of PLANES.
+        start (int): Index of the first slice.
+        stop (int): Index after the last slice.
+
+    Returns:
+        Array of shape (stop - start, rows, columns) of the plane.
+    """
+    check_plane(plane)
+
+    if plane == AXIAL:
+        return volume[start:stop]
+    if plane == CORONAL:
+        return np.moveaxis(volume[::-1, start:stop], 1, 0)
+
+    return np.moveaxis(volume[::-1, :, start:stop], 2, 0)
+
+
+def voxel_spacing(dataset: Dataset) -> Tuple[float, float, float]:
+    """ Size of the voxels in mm, (slices, rows, columns).
+
+    The distance between slices is the SpacingBetweenSlices or, if it's not present, the
+    SliceThickness. The missing values are 1.
+
+    Args:
+        dataset (Dataset): Header of the Dicom file.
+
+    Returns:
+
+    """
+    row, column = [float(v) for v in getattr(dataset, "PixelSpacing", None) or (1, 1)]
+    thickness = getattr(dataset, "SpacingBetweenSlices", None) or \
+        getattr(dataset, "SliceThickness", None) or 1
+
+    return abs(float(thickness)) or 1.0, row or 1.0, column or 1.0
+
+
+def pixel_spacing(spacing: Tuple[float, float, float], plane: str) -> Tuple[float, float]:
+    """ Size in mm, (rows, columns), of the pixels of the slices of a plane.
+
+    Args:
+        spacing: Size of the voxels, see voxel_spacing.
+        plane (str): One of PLANES.
+
+    Returns:
+
+    """
+    check_plane(plane)
+    axis = PLANES.index(plane)
+
+    return spacing[:axis] + spacing[axis + 1:]
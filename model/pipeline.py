@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+""" Render pipeline with cached intermediate results.
+
+The render of an image is split in stages, each one with its parameters. The output of every
+stage is kept, and when a parameter changes only the stage that uses it and the ones after it
+are computed again. Panning doesn't decode the slice again, a contrast change only maps the
+pixels shown.
+
+"""
+
+from typing import Callable, Dict, List, Sequence
+import threading
+import time
+
+import numpy as np
+
+from model.profiling import PROFILER
+
+
+class Stage:
+    """
+    Step of the render pipeline.
+
+    The function receives the output of the previous stage, None for the first one, and the
+    values of the parameters of the stage as keyword arguments. The time of each run is
+    recorded on the profiler as stage.<name>.
+
+    """
+
+    def __init__(self, name: str, function: Callable, params: Sequence[str]):
+        self.name = name
+        self.function = function
+        self.params = tuple(params)
+
+        self.output = None
+        self.values = None
+        self.dirty = True
+
+        self.calls = 0
+        self.last_time = 0.0
+        self.total_time = 0.0
+
+    def run(self, data, values: tuple):
+        start = time.perf_counter()
+        self.output = self.function(data, **dict(zip(self.params, values)))
+        self.last_time = time.perf_counter() - start
+        PROFILER.record("stage." + self.name, self.last_time)
+
+        self.values = values
+        self.dirty = False
+        self.calls += 1
+        self.total_time += self.last_time
+
+        return self.output
+
+    def timing(self) -> dict:
+        return {"calls": self.calls, "last": self.last_time,
+                "mean": self.total_time / self.calls if self.calls else 0.0}
+
+
+class RenderPipeline:
+    """
+    Sequence of stages, each one computed only when it's dirty.
+
+    A stage is dirty when the value of one of its parameters has changed or when a previous
+    stage has been computed again.
+
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.__stages = stages
+        self.__lock = threading.Lock()
+
+    @property
+    def stages(self) -> List[Stage]:
+        return self.__stages
+
+    def render(self, stop: str = None, **params):
+        """ Runs the pipeline with the parameters passed.
+
+        Args:
+            stop (str): Name of the last stage to run, by default all of them are run.
+            **params: Value of every parameter of the stages run.
+
+        Returns:
+            The output of the last stage run.
+        """
+        with self.__lock:
+            data = None
+            dirty = False
+            for idx, stage in enumerate(self.__stages):
+                values = tuple(params[name] for name in stage.params)
+                if dirty or stage.dirty or not _equal(values, stage.values):
+                    stage.dirty = True
+                    stage.run(data, values)
+                    dirty = True
+                data = stage.output
+
+                if stage.name == stop:
+                    for following in self.__stages[idx + 1:]:
+                        following.dirty = following.dirty or dirty
+                    break
+
+            return data
+
+    def cached(self, name: str, **params):
+        """ Output kept by a stage if it was computed with the parameters passed.
+
+        Nothing is run and it doesn't wait for a render running, it's meant for the readers of
+        the intermediate images on the GUI thread.
+
+        Args:
+            name (str): Name of the stage.
+            **params: Value of every parameter of the stage.
+
+        Returns:
+            The output of the stage, or None if it isn't available.
+        """
+        if not self.__lock.acquire(blocking=False):
+            return None
+        try:
+            stage = next(stage for stage in self.__stages if stage.name == name)
+            values = tuple(params[param] for param in stage.params)
+            if stage.dirty or not _equal(values, stage.values):
+                return None
+
+            return stage.output
+        finally:
+            self.__lock.release()
+
+    def invalidate(self, name: str = None):
+        """ Marks a stage, and all the following ones, as dirty.
+
+        Args:
+            name (str): Name of the stage, by default the first one.
+        """
+        with self.__lock:
+            dirty = name is None
+            for stage in self.__stages:
+                dirty = dirty or stage.name == name
+                if dirty:
+                    stage.dirty = True
+
+    def timings(self) -> Dict[str, dict]:
+        """ Number of runs, last and mean time in seconds, of each stage. """
+        return {stage.name: stage.timing() for stage in self.__stages}
+
+
+def _equal(values: tuple, previous: tuple) -> bool:
+    if previous is None or len(values) != len(previous):
+        return False
+
+    return all(np.array_equal(a, b) if isinstance(a, np.ndarray) else a == b
+               for a, b in zip(values, previous))
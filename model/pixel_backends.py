@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+""" Backends to access the pixels of a Dicom file.
+
+Every backend gives access to the frames of the file one by one, so the model never needs to
+decode the whole volume to show a single slice.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import abc
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+from pydicom.dataelem import RawDataElement
+from pydicom.dataset import Dataset
+from pydicom.encaps import encapsulate, generate_pixel_data_frame
+from pydicom.pixel_data_handlers.util import pixel_dtype
+from pydicom import uid
+
+NATIVE_SYNTAXES = [uid.ExplicitVRLittleEndian, uid.ImplicitVRLittleEndian,
+                   uid.DeflatedExplicitVRLittleEndian]
+MAPPABLE_SYNTAXES = [uid.ExplicitVRLittleEndian, uid.ImplicitVRLittleEndian]
+
+PIXEL_DATA = 0x7FE00010
+
+DEFER_SIZE = "512 KB"
+
+FRAME_ATTRIBUTES = ["Rows", "Columns", "SamplesPerPixel", "BitsAllocated", "BitsStored",
+                    "HighBit", "PixelRepresentation", "PhotometricInterpretation",
+                    "PlanarConfiguration"]
+
+
+def n_frames(dataset: Dataset) -> int:
+    """ Number of frames of a dataset, 1 if the tag is not present.  """
+    return int(getattr(dataset, "NumberOfFrames", 1) or 1)
+
+
+def frame_shape(dataset: Dataset) -> Tuple[int, ...]:
+    shape = (int(dataset.Rows), int(dataset.Columns))
+    samples = int(getattr(dataset, "SamplesPerPixel", 1))
+    if samples > 1:
+        shape += (samples,)
+
+    return shape
+
+
+def transfer_syntax(dataset: Dataset) -> str:
+    meta = getattr(dataset, "file_meta", None)
+    return getattr(meta, "TransferSyntaxUID", uid.ImplicitVRLittleEndian)
+
+
+def pixel_data_position(dataset: Dataset) -> Optional[Tuple[int, int]]:
+    """ Position on the file of the first byte of the Pixel Data value and its length.
+
+    The position is only known while the element has not been read, so this function must be
+    called before accessing the pixels of the dataset.
+
+    Args:
+        dataset (Dataset): Dicom file read by pydicom.
+
+    Returns:
+        Tuple with the offset and the length in bytes or None if it can't be known.
+    """
+    for element in dataset.values():
+        if element.tag == PIXEL_DATA:
+            if isinstance(element, RawDataElement) and element.value_tell is not None:
+                return element.value_tell, element.length
+            break
+
+    return None
+
+
+def decode_frame(header: dict, syntax: str, frame: bytes) -> np.ndarray:
+    """ Decodes a single compressed frame through the pydicom handlers.
+
+    Args:
+        header (dict): Values of the FRAME_ATTRIBUTES of the dataset.
+        syntax (str): Transfer syntax of the dataset.
+        frame (bytes): Encoded frame, its fragments joined.
+
+    Returns:
+        The frame as pixel_array returns it.
+    """
+    dataset = Dataset()
+    dataset.file_meta = Dataset()
+    dataset.file_meta.TransferSyntaxUID = syntax
+    dataset.is_little_endian = True
+    dataset.is_implicit_VR = False
+
+    for name, value in header.items():
+        setattr(dataset, name, value)
+    dataset.NumberOfFrames = 1
+    dataset.PixelData = encapsulate([frame])
+    dataset["PixelData"].VR = "OB"
+    dataset["PixelData"].is_undefined_length = True
+
+    return dataset.pixel_array
+
+
+def _decode_frames(header: dict, syntax: str, frames: List[bytes]) -> np.ndarray:
+    return np.stack([decode_frame(header, syntax, frame) for frame in frames])
+
+
+class PixelBackend(abc.ABC):
+    """
+    Access to the frames of a Dicom file.
+
+    The cacheable attribute indicates if it's worth to keep the decoded frames in memory, and
+    volume_is_view if volume() is a view of pixels already in memory or mapped, not a copy.
+
+    """
+    name = None
+    cacheable = True
+    volume_is_view = False
+
+    def __init__(self, dataset: Dataset):
+        self._dataset = dataset
+        self._n_frames = n_frames(dataset)
+        self._frame_shape = frame_shape(dataset)
+
+    def __len__(self):
+        return self._n_frames
+
+    @property
+    def frame_shape(self) -> Tuple[int, ...]:
+        return self._frame_shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return pixel_dtype(self._dataset)
+
+    @property
+    def frame_nbytes(self) -> int:
+        return int(np.prod(self._frame_shape)) * self.dtype.itemsize
+
+    @abc.abstractmethod
+    def get_frame(self, item: int) -> np.ndarray:
+        """ Decodes a single frame.
+
+        Args:
+            item (int): Index of the frame.
+
+        Returns:
+            Array with the frame_shape.
+        """
+        pass
+
+    def volume(self) -> np.ndarray:
+        """ All the frames of the file on a single array of shape (frames, rows, columns).
+
+        Returns:
+
+        """
+        return self.get_frames(0, len(self))
+
+    def get_frames(self, start: int, stop: int) -> np.ndarray:
+        """ Consecutive frames on a single array of shape (stop - start, rows, columns).
+
+        Args:
+            start (int): Index of the first frame.
+            stop (int): Index after the last frame.
+
+        Returns:
+
+        """
+        return np.stack([self.get_frame(i) for i in range(start, min(stop, len(self)))])
+
+    def _check_item(self, item: int):
+        if not -self._n_frames <= item < self._n_frames:
+            raise IndexError(f"Frame {item} out of range (0 - {self._n_frames - 1})")
+
+
+class NativeBackend(PixelBackend):
+    """
+    Uncompressed little endian pixel data.
+
+    Each frame is a view over the raw bytes of the Pixel Data element, the values are only
+    converted when the frame is requested.
+
+    """
+    name = "native"
+    volume_is_view = True
+
+    def __init__(self, dataset: Dataset):
+        super().__init__(dataset)
+        self.__buffer = None
+
+    @staticmethod
+    def supports(dataset: Dataset) -> bool:
+        return (transfer_syntax(dataset) in NATIVE_SYNTAXES and
+                int(dataset.BitsAllocated) in (8, 16, 32, 64) and
+                int(getattr(dataset, "PlanarConfiguration", 0)) == 0)
+
+    def get_frame(self, item: int) -> np.ndarray:
+        self._check_item(item)
+        if self.__buffer is None:
+            self.__buffer = self._dataset.PixelData
+
+        item = item % self._n_frames
+        count = int(np.prod(self._frame_shape))
+        frame = np.frombuffer(self.__buffer, dtype=self.dtype, count=count,
+                              offset=item * self.frame_nbytes)
+
+        return frame.reshape(self._frame_shape)
+
+    def volume(self) -> np.ndarray:
+        if self.__buffer is None:
+            self.__buffer = self._dataset.PixelData
+
+        count = self._n_frames * int(np.prod(self._frame_shape))
+        volume = np.frombuffer(self.__buffer, dtype=self.dtype, count=count)
+
+        return volume.reshape((self._n_frames,) + self._frame_shape)
+
+
+class MemmapBackend(PixelBackend):
+    """
+    Uncompressed little endian pixel data mapped in memory.
+
+    The frames are views over a numpy.memmap of the file, so slicing doesn't copy anything and
+    the pages are shared through the OS cache between all the processes reading the file.
+
+    """
+    name = "memmap"
+    cacheable = False
+    volume_is_view = True
+
+    def __init__(self, dataset: Dataset, offset: int):
+        super().__init__(dataset)
+        self.__volume = np.memmap(dataset.filename, dtype=self.dtype.newbyteorder("<"),
+                                  mode="r", offset=offset,
+                                  shape=(self._n_frames,) + self._frame_shape)
+
+    @staticmethod
+    def supports(dataset: Dataset) -> bool:
+        return (NativeBackend.supports(dataset) and
+                transfer_syntax(dataset) in MAPPABLE_SYNTAXES and
+                isinstance(getattr(dataset, "filename", None), str))
+
+    def volume(self) -> np.ndarray:
+        return self.__volume
+
+    def get_frames(self, start: int, stop: int) -> np.ndarray:
+        return self.__volume[start:stop]
+
+    def get_frame(self, item: int) -> np.ndarray:
+        self._check_item(item)
+
+        return self.__volume[item]
+
+
+class PydicomBackend(PixelBackend):
+    """
+    Pixel data decoded through the pydicom handlers.
+
+    Used for the single frame compressed files and the syntaxes the other backends don't
+    support, pydicom can only decode the whole volume so it's decoded the first time a frame is
+    requested.
+
+    """
+    name = "pydicom"
+
+    def __init__(self, dataset: Dataset):
+        super().__init__(dataset)
+        self.__volume = None
+
+    def volume(self) -> np.ndarray:
+        if self.__volume is None:
+            volume = self._dataset.pixel_array
+            if self._n_frames == 1:
+                volume = volume[np.newaxis]
+            self.__volume = volume
+
+        return self.__volume
+
+    def get_frames(self, start: int, stop: int) -> np.ndarray:
+        return self.volume()[start:stop]
+
+    def get_frame(self, item: int) -> np.ndarray:
+        self._check_item(item)
+
+        return self.volume()[item]
+
+
+class EncapsulatedBackend(PixelBackend):
+    """
+    Compressed multiframe pixel data decoded frame by frame.
+
+    The encapsulated Pixel Data is split in its frames once. The frames, and the ranges of
+    frames, are decoded one by one on the calling thread when they are requested. Only volume()
+    decodes all the frames on a pool of processes, a chunk of frames per task, into a
+    preallocated array that isn't kept, it's meant for the consumers of the whole volume.
+
+    """
+    name = "encapsulated"
+
+    def __init__(self, dataset: Dataset, workers: int = None):
+        super().__init__(dataset)
+        self.__workers = workers or os.cpu_count() or 1
+        self.__syntax = str(transfer_syntax(dataset))
+        self.__header = {name: dataset[name].value for name in FRAME_ATTRIBUTES
+                         if name in dataset}
+
+        self.__frames = None
+        self.__frames_lock = threading.Lock()
+
+    @staticmethod
+    def supports(dataset: Dataset) -> bool:
+        return transfer_syntax(dataset).is_compressed and n_frames(dataset) > 1
+
+    def __encoded_frames(self) -> List[bytes]:
+        with self.__frames_lock:
+            if self.__frames is None:
+                self.__frames = list(generate_pixel_data_frame(self._dataset.PixelData,
+                                                               self._n_frames))
+
+        return self.__frames
+
+    def get_frame(self, item: int) -> np.ndarray:
+        self._check_item(item)
+        frame = self.__encoded_frames()[item]
+
+        return decode_frame(self.__header, self.__syntax, frame)
+
+    def volume(self) -> np.ndarray:
+        frames = self.__encoded_frames()
+        if self.__workers <= 1:
+            return self.__fill(((i, _decode_frames(self.__header, self.__syntax, [frame]))
+                                for i, frame in enumerate(frames)), len(frames))
+
+        n_chunks = min(len(frames), self.__workers * 4)
+        bounds = np.linspace(0, len(frames), n_chunks + 1).astype(int)
+
+        # The processes are spawned, forking a process with threads running isn't safe
+        with ProcessPoolExecutor(max_workers=self.__workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [(start, pool.submit(_decode_frames, self.__header, self.__syntax,
+                                           frames[start:stop]))
+                       for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+            return self.__fill(((start, future.result()) for start, future in futures),
+                               len(frames))
+
+    @staticmethod
+    def __fill(chunks, n: int) -> np.ndarray:
+        """ Copies the decoded chunks, (first frame, frames), to an array allocated once.  """
+        volume = None
+        for start, chunk in chunks:
+            if volume is None:
+                volume = np.empty((n,) + chunk.shape[1:], dtype=chunk.dtype)
+            volume[start:start + len(chunk)] = chunk
+
+        return volume
+
+
+def select_backend(dataset: Dataset, workers: int = None) -> PixelBackend:
+    """ Choose the fastest backend able to read the pixel data of the dataset.
+
+    Args:
+        dataset (Dataset): Dicom file read by pydicom.
+        workers (int): Processes decoding the volume of the compressed multiframe files, by
+            default the number of cores.
+
+    Returns:
+        The backend instance.
+    """
+    if MemmapBackend.supports(dataset):
+        position = pixel_data_position(dataset)
+        expected = n_frames(dataset) * int(np.prod(frame_shape(dataset))) * \
+            pixel_dtype(dataset).itemsize
+        if position is not None and position[1] >= expected:
+            return MemmapBackend(dataset, position[0])
+
+    if NativeBackend.supports(dataset):
+        return NativeBackend(dataset)
+
+    if EncapsulatedBackend.supports(dataset):
+        return EncapsulatedBackend(dataset, workers)
+
+    return PydicomBackend(dataset)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+""" Prefetching of rendered slices.
+
+While the user scrolls through the slices the next ones in the direction of the movement are
+rendered in background, so when the slider reaches them the image is already available.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Hashable
+import threading
+import time
+
+import numpy as np
+
+from model.frame_cache import FrameCache
+
+RENDER_BUDGET = 64 * 1024 * 1024
+
+
+class SlicePrefetcher:
+    """
+    Renders in advance the slices a DicomImage is going to show.
+
+    The rendered images are stored on a bounded cache keyed by the slice and the render
+    parameters (contrast, zoom, position and plane), see DicomImage.render_key. The number of
+    slices rendered in advance grows with the speed of the scroll.
+
+    """
+
+    def __init__(self, model, workers: int = 2, ahead: int = 4, max_ahead: int = 16,
+                 horizon: float = 0.25, cache_size: int = RENDER_BUDGET):
+        """ Constructor of the prefetcher.
+
+        Args:
+            model (DicomImage): Image to render.
+            workers (int): Number of threads rendering in background.
+            ahead (int): Minimum number of slices rendered in advance.
+            max_ahead (int): Maximum number of slices rendered in advance.
+            horizon (float): Seconds of scroll, at the current velocity, to render in advance.
+            cache_size (int): Bytes of the cache of rendered images.
+        """
+        self.__model = model
+        self.__ahead = ahead
+        self.__max_ahead = max_ahead
+        self.__horizon = horizon
+
+        self.__cache = FrameCache(cache_size)
+        self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.__pending: Dict[Hashable, Future] = {}
+        self.__lock = threading.Lock()
+        self.__generation = 0
+
+        self.__last_item = None
+        self.__last_time = None
+        self.__direction = 1
+        self.__velocity = 0.0
+
+    @property
+    def direction(self) -> int:
+        return self.__direction
+
+    @property
+    def velocity(self) -> float:
+        """ Slices per second of the last movement. """
+        return self.__velocity
+
+    @property
+    def cache_info(self) -> dict:
+        return self.__cache.stats()
+
+    def get(self, item: int) -> np.ndarray:
+        """ Get the slice rendered with the current parameters of the model.
+
+        If the slice has been prefetched it's returned directly, if it's being rendered waits
+        for it, otherwise it's rendered on the calling thread through the render pipeline of the
+        model, reusing the stages that haven't changed.
+
+        Args:
+            item (int): Index of the slice.
+
+        Returns:
+            The rendered image.
+        """
+        key = self.__model.render_key(item)
+
+        with self.__lock:
+            future = self.__pending.get(key)
+        if future is not None and not future.cancelled():
+            future.result()
+
+        return self.__cache.get(key, lambda: self.__model[item])
+
+    def notify(self, item: int):
+        """ Informs the prefetcher that a slice has been shown.
+
+        Updates the direction and velocity of the scroll and schedules the render of the next
+        slices.
+
+        Args:
+            item (int): Index of the slice shown.
+        """
+        now = time.perf_counter()
+        if self.__last_item is not None and item != self.__last_item:
+            elapsed = max(now - self.__last_time, 1e-3)
+            self.__direction = 1 if item > self.__last_item else -1
+            self.__velocity = abs(item - self.__last_item) / elapsed
+        self.__last_item = item
+        self.__last_time = now
+
+        n_ahead = int(self.__ahead + self.__velocity * self.__horizon)
+        n_ahead = min(n_ahead, self.__max_ahead)
+
+        for step in range(1, n_ahead + 1):
+            next_item = item + self.__direction * step
+            if 0 <= next_item < len(self.__model):
+                self.__schedule(next_item)
+
+    def invalidate(self):
+        """ Discards the rendered images and cancels the pending renders.
+
+        Must be called when the render parameters change.
+        """
+        with self.__lock:
+            self.__generation += 1
+            for future in self.__pending.values():
+                future.cancel()
+            self.__pending.clear()
+        self.__cache.clear()
+
+    def close(self):
+        self.invalidate()
+        self.__pool.shutdown(wait=False)
+
+    def __schedule(self, item: int):
+        key = self.__model.render_key(item)
+
+        with self.__lock:
+            if key in self.__cache or key in self.__pending:
+                return
+            future = self.__pool.submit(self.__render, item, key, self.__generation)
+            self.__pending[key] = future
+
+    def __render(self, item: int, key: tuple, generation: int):
+        try:
+            img = self.__model.render(item, *key[1:])
+            if generation == self.__generation:
+                self.__cache.put(key, img)
+        finally:
+            with self.__lock:
+                if self.__pending.get(key) is not None and generation == self.__generation:
+                    del self.__pending[key]
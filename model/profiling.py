@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+""" Timing of the actions of the viewer and of the stages of the render.
+
+Every duration is added to a metric with its count, total, minimum, maximum and a histogram of
+logarithmic buckets, so recording costs a few operations and no memory grows with the number of
+records. It's meant to be always enabled.
+
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List
+import csv
+import json
+import threading
+import time
+
+# Upper bounds, in seconds, of the buckets of the histograms: 10 us to ~84 s, doubling
+BUCKETS = [1e-5 * 2 ** i for i in range(24)]
+
+PERCENTILES = (50, 95, 99)
+
+COLUMNS = ["name", "count", "total", "mean", "min", "max"] + [f"p{p}" for p in PERCENTILES]
+
+
+class Metric:
+    """
+    Durations recorded with the same name.
+
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def percentile(self, percentile: float) -> float:
+        """ Upper bound of the bucket of the percentile, the maximum on the last bucket.  """
+        if not self.count:
+            return 0.0
+
+        rank = percentile / 100 * self.count
+        accumulated = 0
+        for idx, count in enumerate(self.buckets):
+            accumulated += count
+            if accumulated >= rank and count:
+                return min(BUCKETS[idx], self.max) if idx < len(BUCKETS) else self.max
+
+        return self.max
+
+    def summary(self) -> dict:
+        summary = {"name": self.name, "count": self.count, "total": self.total,
+                   "mean": self.total / self.count if self.count else 0.0,
+                   "min": self.min if self.count else 0.0, "max": self.max}
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}"] = self.percentile(percentile)
+
+        return summary
+
+
+class Profiler:
+    """
+    Store of the metrics, safe to record from any thread.
+
+    The names are grouped by a prefix: action. for the actions of the controller, stage. for the
+    stages of the render pipeline, view. for the display on Tk.
+
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.__metrics: Dict[str, Metric] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        """ Adds a duration to a metric.
+
+        Args:
+            name (str): Name of the metric, created the first time.
+            seconds (float): Duration.
+        """
+        if not self.enabled:
+            return
+
+        with self.__lock:
+            metric = self.__metrics.get(name)
+            if metric is None:
+                metric = self.__metrics[name] = Metric(name)
+            metric.add(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """ Records the duration of the block of a with statement.  """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> List[dict]:
+        """ Summary of each metric, ordered by name, with the times in seconds.  """
+        with self.__lock:
+            return [self.__metrics[name].summary() for name in sorted(self.__metrics)]
+
+    def reset(self):
+        with self.__lock:
+            self.__metrics.clear()
+
+    def to_json(self, path: str, **extra):
+        """ Writes the summary of the metrics, and the extra values passed, as JSON.  """
+        with open(path, "w") as file:
+            json.dump(dict(metrics=self.summary(), **extra), file, indent=2)
+
+    def to_csv(self, path: str):
+        """ Writes the summary of the metrics as CSV, a row per metric.  """
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.summary())
+
+
+PROFILER = Profiler()
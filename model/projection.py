@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+""" Projections of thick slabs of slices.
+
+The maximum (MIP), minimum (MinIP) and average (AvgIP) intensity projections of a slab of
+consecutive slices are computed with the van Herk / Gil-Werman algorithm. The slices are split
+in blocks of the thickness of the slab, and the running reduction of each block is kept from its
+start and from its end. Any slab is then the reduction of the end of one block and the start of
+the next one, so moving the slab one slice costs a single operation between two images, not the
+reduction of the whole slab.
+
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+import threading
+
+import numpy as np
+
+MIP = "mip"
+MINIP = "minip"
+AVGIP = "avgip"
+
+OPERATIONS: Dict[str, np.ufunc] = {MIP: np.maximum, MINIP: np.minimum, AVGIP: np.add}
+
+
+def check_mode(mode: str):
+    if mode not in OPERATIONS:
+        raise ValueError(f"Unknown projection {mode}, must be one of {', '.join(OPERATIONS)}")
+
+
+def _accumulator_dtype(mode: str, dtype: np.dtype) -> np.dtype:
+    """ Type of the running reductions, the sums need more bits than the slices. """
+    if mode != AVGIP:
+        return dtype
+    if dtype.kind in "ui":
+        return np.dtype(np.int32) if dtype.itemsize <= 2 else np.dtype(np.int64)
+
+    return np.dtype(np.float64)
+
+
+class SlabProjector:
+    """
+    Projections of slabs of a fixed thickness over a stack of slices.
+
+    The running reductions of the last blocks used are kept, so scrolling through the slabs
+    only reads and reduces each slice once.
+
+    """
+
+    def __init__(self, get_slices: Callable[[int, int], np.ndarray], n_slices: int, mode: str,
+                 thickness: int, max_blocks: int = 4):
+        """ Constructor of the projector.
+
+        Args:
+            get_slices (Callable): Function returning the slices between two indices, as an
+                array of shape (slices, rows, columns).
+            n_slices (int): Number of slices.
+            mode (str): Projection, one of MIP, MINIP or AVGIP.
+            thickness (int): Number of slices of the slab.
+            max_blocks (int): Number of blocks whose running reductions are kept.
+        """
+        check_mode(mode)
+
+        self.__get_slices = get_slices
+        self.__n_slices = n_slices
+        self.__mode = mode
+        self.__operation = OPERATIONS[mode]
+        self.__thickness = max(1, min(int(thickness), n_slices))
+        self.__max_blocks = max_blocks
+
+        self.__dtype = None
+        self.__blocks = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @property
+    def mode(self) -> str:
+        return self.__mode
+
+    @property
+    def thickness(self) -> int:
+        return self.__thickness
+
+    def slab(self, item: int) -> Tuple[int, int]:
+        """ First slice and slice after the last one of the slab centered on a slice.
+
+        The slab is moved inside the stack near the first and the last slices, so all the slabs
+        have the same thickness.
+        """
+        if not 0 <= item < self.__n_slices:
+            raise IndexError(f"Slice {item} out of range (0 - {self.__n_slices - 1})")
+
+        start = min(max(item - self.__thickness // 2, 0), self.__n_slices - self.__thickness)
+
+        return start, start + self.__thickness
+
+    def project(self, item: int) -> np.ndarray:
+        """ Projection of the slab centered on a slice.
+
+        Args:
+            item (int): Index of the central slice.
+
+        Returns:
+            Image with the type of the slices, the averages are rounded on the integer types.
+        """
+        start, stop = self.slab(item)
+        block, offset = divmod(start, self.__thickness)
+
+        if offset == 0:
+            result = self.__block(block)[0][-1]
+        else:
+            result = self.__operation(self.__block(block)[1][offset],
+                                      self.__block(block + 1)[0][offset - 1])
+
+        if self.__mode == AVGIP:
+            result = result / self.__thickness
+            dtype = self.__dtype
+            if dtype.kind in "ui":
+                result = np.rint(result)
+            return result.astype(dtype)
+
+        return result
+
+    def __block(self, block: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Running reductions of a block from its first slice and from its last slice.  """
+        with self.__lock:
+            if block in self.__blocks:
+                self.__blocks.move_to_end(block)
+                return self.__blocks[block]
+
+        start = block * self.__thickness
+        slices = np.asarray(self.__get_slices(start, min(start + self.__thickness,
+                                                         self.__n_slices)))
+        self.__dtype = slices.dtype
+        slices = slices.astype(_accumulator_dtype(self.__mode, slices.dtype), copy=False)
+
+        forward = self.__operation.accumulate(slices, axis=0)
+        backward = self.__operation.accumulate(slices[::-1], axis=0)[::-1]
+
+        with self.__lock:
+            self.__blocks[block] = (forward, backward)
+            while len(self.__blocks) > self.__max_blocks:
+                self.__blocks.popitem(last=False)
+
+        return forward, backward
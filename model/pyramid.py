@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+""" Multi-resolution pyramid of an image.
+
+Each level halves the previous one averaging the areas of its pixels, and is only computed the
+first time it's needed. The render picks the level closest to the scale it's shown at, so a big
+image shown reduced is resampled from a small level, and shown with zoom from the full resolution
+pixels.
+
+"""
+
+from typing import List
+import math
+import threading
+
+import cv2
+import numpy as np
+
+# Types cv2.resize and cv2.warpAffine work with, the other ones are converted to float32
+CV2_TYPES = [np.dtype(dtype) for dtype in (np.uint8, np.uint16, np.int16, np.float32,
+                                           np.float64)]
+
+
+class ImagePyramid:
+    """
+    Levels of reduction by 2 of an image, the level 0 is the image itself.
+
+    """
+
+    def __init__(self, image: np.ndarray):
+        if image.dtype not in CV2_TYPES:
+            image = image.astype(np.float32)
+        self.__levels: List[np.ndarray] = [image]
+        self.__lock = threading.Lock()
+
+        height, width = image.shape[:2]
+        self.__n_levels = 1 + max(int(math.log2(max(min(height, width), 1))), 0)
+
+    def __len__(self):
+        return self.__n_levels
+
+    @property
+    def shape(self) -> tuple:
+        return self.__levels[0].shape
+
+    def level(self, n: int) -> np.ndarray:
+        """ Image of a level, computed from the previous one the first time.
+
+        Args:
+            n (int): Level, clamped to the levels of the pyramid.
+
+        Returns:
+            The image of the level, the size of the image divided by 2 ** n, rounded up.
+        """
+        n = min(max(n, 0), self.__n_levels - 1)
+        with self.__lock:
+            while len(self.__levels) <= n:
+                previous = self.__levels[-1]
+                height, width = previous.shape[:2]
+                # The slices of the coronal and sagittal planes are strided views
+                self.__levels.append(cv2.resize(np.ascontiguousarray(previous),
+                                                ((width + 1) // 2, (height + 1) // 2),
+                                                interpolation=cv2.INTER_AREA))
+
+        return self.__levels[n]
+
+    def level_for(self, scale: float) -> int:
+        """ Smallest level with at least a pixel per pixel shown.
+
+        Args:
+            scale (float): Pixels shown per pixel of the level 0.
+
+        Returns:
+            Index of the level.
+        """
+        if scale >= 1:
+            return 0
+
+        return min(int(math.floor(-math.log2(scale) + 1e-9)), self.__n_levels - 1)
+
+    def render(self, scale, corner, shape) -> np.ndarray:
+        """ Rectangle of the image resized by a scale, resampled from the closest level.
+
+        Only the region of the level under the rectangle is cropped and resized, so the time
+        doesn't depend on the size of the image nor on the scale. The pixel centers are aligned
+        as cv2.resize does.
+
+        Args:
+            scale: Pixels rendered per pixel of the image, (rows, columns).
+            corner: Top left corner of the rectangle on the resized image, (row, column).
+            shape: Rows and columns of the rectangle.
+
+        Returns:
+            Image with the shape of the rectangle.
+        """
+        scale = np.asarray(scale, dtype=np.float64)
+        corner = np.asarray(corner, dtype=np.float64)
+        shape = np.asarray(shape, dtype=int)
+
+        level = self.level(self.level_for(max(scale)))
+        level_shape = np.array(level.shape[:2])
+        # Pixels rendered per pixel of the level
+        factor = scale * np.array(self.shape[:2]) / level_shape
+
+        start = np.maximum(np.floor(corner / factor).astype(int) - 1, 0)
+        stop = np.minimum(np.ceil((corner + shape) / factor).astype(int) + 1, level_shape)
+        region = np.ascontiguousarray(level[start[0]:stop[0], start[1]:stop[1]])
+
+        offset = (start + 0.5) * factor - corner - 0.5
+        transform = np.array([[factor[1], 0, offset[1]], [0, factor[0], offset[0]]],
+                             dtype=np.float64)
+
+        return cv2.warpAffine(region, transform, (int(shape[1]), int(shape[0])),
+                              flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
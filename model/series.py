@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+""" Series of Dicom files with one slice per file.
+
+The headers of the files of a directory are parsed in parallel, without the pixel data, and the
+files are grouped by series and sorted by their position. The pixels of each file are only read
+when its slice is requested.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import multiprocessing
+import os
+
+import numpy as np
+from pydicom.dataset import Dataset
+from pydicom.errors import InvalidDicomError
+from pydicom.filereader import dcmread
+
+from model import pixel_backends
+
+
+def read_header(path: str) -> Optional[dict]:
+    """ Reads the tags needed to group and sort a file on its series, and to index it.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        Dictionary with the tags, None if the file is not a Dicom image.
+    """
+    try:
+        dataset = dcmread(path, stop_before_pixels=True)
+    except (InvalidDicomError, OSError, EOFError, ValueError):
+        return None
+
+    if "Rows" not in dataset or "SeriesInstanceUID" not in dataset:
+        return None
+
+    position = getattr(dataset, "ImagePositionPatient", None)
+    orientation = getattr(dataset, "ImageOrientationPatient", None)
+    instance = getattr(dataset, "InstanceNumber", None)
+
+    return {"path": path, "series": str(dataset.SeriesInstanceUID),
+            "position": None if position is None else [float(v) for v in position],
+            "orientation": None if orientation is None else [float(v) for v in orientation],
+            "instance": None if instance is None else int(instance),
+            "patient_id": str(getattr(dataset, "PatientID", "")),
+            "patient_name": str(getattr(dataset, "PatientName", "")),
+            "study": str(getattr(dataset, "StudyInstanceUID", "")),
+            "sop": str(getattr(dataset, "SOPInstanceUID", "")),
+            "rows": int(dataset.Rows), "columns": int(dataset.Columns),
+            "frames": pixel_backends.n_frames(dataset),
+            "transfer_syntax": str(pixel_backends.transfer_syntax(dataset))}
+
+
+def _sort_key(header: dict):
+    """ Orders the slices by their position along the normal of the plane.
+
+    Files without position are ordered by their instance number and their name.
+    """
+    position, orientation = header["position"], header["orientation"]
+    if position is not None and orientation is not None:
+        normal = np.cross(orientation[:3], orientation[3:])
+        return 0, float(np.dot(normal, position)), header["instance"] or 0, header["path"]
+
+    return 1, 0.0, header["instance"] or 0, header["path"]
+
+
+def scan_directory(directory: str, workers: int = None) -> Dict[str, List[dict]]:
+    """ Groups by series the Dicom files of a directory.
+
+    The headers are parsed on a pool of processes. They are spawned, forking the GUI process
+    while its render and prefetch threads run isn't safe.
+
+    Args:
+        directory (str): Path of the directory, subdirectories are not scanned.
+        workers (int): Number of processes, by default the number of cores.
+
+    Returns:
+        Dictionary from the SeriesInstanceUID to the headers of its files, sorted.
+    """
+    paths = sorted(entry.path for entry in os.scandir(directory) if entry.is_file())
+
+    workers = workers or os.cpu_count() or 1
+    if len(paths) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            chunksize = max(1, len(paths) // (4 * workers))
+            headers = list(pool.map(read_header, paths, chunksize=chunksize))
+    else:
+        headers = [read_header(path) for path in paths]
+
+    series = {}
+    for header in headers:
+        if header is not None:
+            series.setdefault(header["series"], []).append(header)
+
+    return {uid: sort_headers(files) for uid, files in series.items()}
+
+
+def sort_headers(headers: List[dict]) -> List[dict]:
+    """ Sorts the headers of the files of a series by the position of their slice.  """
+    return sorted(headers, key=_sort_key)
+
+
+class SeriesBackend(pixel_backends.PixelBackend):
+    """
+    Slices of a series, one per file.
+
+    Each file is read when its slice is requested, with the fastest backend for the file.
+
+    """
+    name = "series"
+
+    def __init__(self, paths: List[str]):
+        header = dcmread(paths[0], stop_before_pixels=True)
+        super().__init__(header)
+
+        self._n_frames = len(paths)
+        self.__paths = paths
+        self.__header = header
+
+    @property
+    def header(self) -> Dataset:
+        """ Header of the first file of the series. """
+        return self.__header
+
+    @property
+    def paths(self) -> List[str]:
+        return self.__paths
+
+    def get_frame(self, item: int) -> np.ndarray:
+        self._check_item(item)
+
+        dataset = dcmread(self.__paths[item], defer_size=pixel_backends.DEFER_SIZE)
+        frame = pixel_backends.select_backend(dataset).get_frame(0)
+
+        return np.array(frame)
+
+
+def load_series(directory: str, series_uid: str = None, workers: int = None,
+                index=None) -> SeriesBackend:
+    """ Loads a series of a directory.
+
+    Args:
+        directory (str): Path of the directory.
+        series_uid (str): SeriesInstanceUID to load, by default the series with more files.
+        workers (int): Number of processes parsing the headers.
+        index (DicomIndex): If passed the headers are read from the index, which is updated
+            only with the files that changed.
+
+    Returns:
+        The backend of the series.
+    """
+    if index is not None:
+        index.scan(directory, workers)
+        series = index.series_in_directory(directory)
+    else:
+        series = scan_directory(directory, workers)
+    if not series:
+        raise InvalidDicomError(f"No Dicom images found on {directory}")
+
+    if series_uid is None:
+        series_uid = max(series, key=lambda uid: len(series[uid]))
+
+    return SeriesBackend([header["path"] for header in series[series_uid]])
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+""" Statistics of the values of a volume.
+
+The minimum, maximum, mean, percentiles and histogram of every slice and of the whole volume are
+computed on a single pass over the volume, a chunk of slices at a time. The results are saved on
+a sidecar file in the cache directory, so opening the same file again doesn't scan its pixels.
+
+"""
+
+from typing import Callable, List, Optional, Tuple
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+
+import numpy as np
+
+import functions as funcs
+
+PERCENTILES = (1, 5, 50, 95, 99)
+STATISTICS = ("minimum", "maximum", "mean", "percentiles", "histograms")
+CHUNK_BYTES = 64 * 1024 * 1024
+BLOCK = 1024 * 1024
+VERSION = 2
+
+
+def _histogram_range(minimum, maximum) -> Tuple[float, float]:
+    return min(0, minimum), maximum
+
+
+def _counted(dtype: np.dtype) -> bool:
+    """ True if the values of a type are counted one by one, the integers up to 16 bits.  """
+    return dtype.kind in "ui" and dtype.itemsize <= 2
+
+
+def _value_counts(image: np.ndarray) -> np.ndarray:
+    """ Number of pixels of each value of an image of integers up to 16 bits.
+
+    The values are counted by blocks, np.bincount converts them to intp, so only a block is
+    copied widened. The signed values are offset to unsigned flipping their sign bit.
+
+    Args:
+        image (np.ndarray): Image or volume.
+
+    Returns:
+        Array with the counts, the first one is of the minimum value of the type.
+    """
+    info = np.iinfo(image.dtype)
+    unsigned = np.dtype("u%d" % image.dtype.itemsize)
+    flat = np.ascontiguousarray(image).reshape(-1).view(unsigned)
+
+    counts = np.zeros(info.max - info.min + 1, dtype=np.int64)
+    for start in range(0, len(flat), BLOCK):
+        block = flat[start:start + BLOCK]
+        if info.min < 0:
+            block = block ^ unsigned.type(-info.min)
+        counts += np.bincount(block, minlength=len(counts))
+
+    return counts
+
+
+def _counts_statistics(counts: np.ndarray, dtype: np.dtype, bins: int) -> dict:
+    """ Statistics of the values counted by _value_counts.
+
+    The percentiles are the values where the cumulative counts reach them, so they are exact.
+    """
+    values = np.arange(np.iinfo(dtype).min, np.iinfo(dtype).max + 1, dtype=np.int64)
+    present = np.flatnonzero(counts)
+    minimum, maximum = values[present[0]], values[present[-1]]
+    low, high = _histogram_range(minimum, maximum)
+
+    cumulative = np.cumsum(counts)
+    positions = np.searchsorted(cumulative, np.array(PERCENTILES) / 100 * cumulative[-1])
+
+    idx = np.clip((values - low) * bins // max(high - low + 1, 1), 0, bins - 1)
+
+    return {"minimum": minimum, "maximum": maximum,
+            "mean": float(np.dot(counts, values.astype(np.float64)) / cumulative[-1]),
+            "percentiles": values[np.minimum(positions, len(values) - 1)].astype(np.float64),
+            "histograms": np.bincount(idx, weights=counts, minlength=bins).astype(np.int64)}
+
+
+def _chunk_bounds(chunk: np.ndarray) -> dict:
+    """ Minimum and maximum of each slice of a chunk, the statistics needed to show it. """
+    flat = chunk.reshape(len(chunk), -1)
+
+    return {"minimum": flat.min(axis=1), "maximum": flat.max(axis=1)}
+
+
+def _chunk_statistics(chunk: np.ndarray, bins: int,
+                      percentiles: bool = True) -> Tuple[dict, Optional[np.ndarray]]:
+    """ Statistics of each slice of a chunk.
+
+    The integers up to 16 bits are counted by value, see _value_counts, and all the statistics
+    come from the counts. The other types are reduced a slice at a time, so the copies made are
+    of a slice and not of the whole chunk.
+
+    Args:
+        chunk (np.ndarray): Slices of shape (n, rows, columns).
+        bins (int): Number of bins of the histograms.
+        percentiles (bool): If false the percentiles of the types that need to sort the values
+            aren't computed.
+
+    Returns:
+        Dictionary with an array for each statistic, the first dimension are the slices, and the
+        counts of each value of the chunk, or None if its type isn't counted by value.
+    """
+    if _counted(chunk.dtype):
+        counts = [_value_counts(image) for image in chunk]
+        slices = [_counts_statistics(c, chunk.dtype, bins) for c in counts]
+
+        return ({name: np.array([s[name] for s in slices]) for name in STATISTICS},
+                np.sum(counts, axis=0))
+
+    flat = chunk.reshape(len(chunk), -1)
+    minimum = flat.min(axis=1)
+    maximum = flat.max(axis=1)
+    statistics = {"minimum": minimum, "maximum": maximum,
+                  "mean": flat.mean(axis=1, dtype=np.float64),
+                  "histograms": np.stack([funcs.histogram_counts(f, _histogram_range(lo, hi), bins)
+                                          for f, lo, hi in zip(flat, minimum, maximum)])}
+    if percentiles:
+        statistics["percentiles"] = np.stack([np.percentile(f, PERCENTILES) for f in flat])
+
+    return statistics, None
+
+
+class VolumeStatistics:
+    """
+    Store of the statistics of the slices and of the volume of a Dicom file.
+
+    The statistics of a slice are computed on demand when they are asked for the first time,
+    only the cheap ones: the minimum and maximum, needed to show the slice, or the mean and the
+    histogram. The percentiles of the slices come from compute(), that makes the pass over the
+    whole volume and saves the results. The item None refers to the whole volume in all the
+    methods.
+
+    """
+
+    def __init__(self, path: str, get_frames: Callable[[int, int], np.ndarray], n_slices: int,
+                 bins: int = funcs.HISTOGRAM_BINS, chunk_bytes: int = CHUNK_BYTES,
+                 persist: bool = True, files: List[str] = None,
+                 scan_frames: Callable[[int, int], np.ndarray] = None):
+        """ Constructor of the store, loads the sidecar file if it's valid.
+
+        Args:
+            path (str): Path of the Dicom file, the key of the sidecar.
+            get_frames (Callable): Function returning the raw slices between two indices.
+            n_slices (int): Number of slices of the volume.
+            bins (int): Number of bins of the histograms.
+            chunk_bytes (int): Bytes of the slices read at once on the pass over the volume.
+            persist (bool): If true the statistics are saved and loaded from the cache.
+            files (List[str]): Files of the slices when the path is a directory with a series,
+                the sidecar is only valid while none of them changes.
+            scan_frames (Callable): Function returning the raw slices for the pass over the
+                volume, by default get_frames. It can return fewer slices once cancelled.
+        """
+        self.__path = path
+        self.__files = files
+        self.__get_frames = get_frames
+        self.__scan_frames = scan_frames or get_frames
+        self.__cancelled = threading.Event()
+        self.__n_slices = n_slices
+        self.__bins = bins
+        self.__chunk_bytes = chunk_bytes
+        self.__persist = persist
+        self.__lock = threading.Lock()
+        self.__compute_lock = threading.Lock()
+
+        self.__computed = {name: np.zeros(n_slices, dtype=bool) for name in STATISTICS}
+        self.__slices = {"minimum": np.zeros(n_slices), "maximum": np.zeros(n_slices),
+                         "mean": np.zeros(n_slices),
+                         "percentiles": np.zeros((n_slices, len(PERCENTILES))),
+                         "histograms": np.zeros((n_slices, bins), dtype=np.int64)}
+        self.__volume = None
+
+        if persist:
+            self.load()
+
+    @property
+    def complete(self) -> bool:
+        """ True if the statistics of the volume are available. """
+        return self.__volume is not None
+
+    @property
+    def sidecar(self) -> str:
+        return os.path.join(funcs.cache_dir("statistics"), self.__identity() + ".npz")
+
+    def __identity(self) -> str:
+        """ Hash of the path, and of the files of a series, several series can share a folder. """
+        paths = [os.path.abspath(self.__path)]
+        if self.__files:
+            paths += sorted(os.path.abspath(path) for path in self.__files)
+
+        return hashlib.sha1("\n".join(paths).encode("utf-8")).hexdigest()
+
+    def minimum(self, item: Optional[int] = None):
+        return self.__get("minimum", item)
+
+    def maximum(self, item: Optional[int] = None):
+        return self.__get("maximum", item)
+
+    def mean(self, item: Optional[int] = None) -> float:
+        return self.__get("mean", item)
+
+    def percentile(self, percentile: int, item: Optional[int] = None) -> float:
+        """ Value of one of the precomputed percentiles, see PERCENTILES.  """
+        return self.__get("percentiles", item)[PERCENTILES.index(percentile)]
+
+    def histogram(self, item: Optional[int] = None) -> np.ndarray:
+        """ Counts of the histogram, the bins go from min(0, minimum) to the maximum. """
+        return self.__get("histograms", item)
+
+    def value_range(self, item: Optional[int] = None) -> Tuple[float, float]:
+        return _histogram_range(self.minimum(item), self.maximum(item))
+
+    def __get(self, name: str, item: Optional[int]):
+        if item is None:
+            if self.__volume is None:
+                self.compute()
+            return self.__volume[name]
+
+        if not self.__computed[name][item]:
+            if name == "percentiles":
+                self.compute()
+            elif name in ("minimum", "maximum"):
+                self.__store(item, _chunk_bounds(self.__get_frames(item, item + 1)))
+            else:
+                self.__store(item, _chunk_statistics(self.__get_frames(item, item + 1),
+                                                     self.__bins, percentiles=False)[0])
+        return self.__slices[name][item]
+
+    def __store(self, start: int, statistics: dict):
+        with self.__lock:
+            stop = start + len(statistics["minimum"])
+            for name, values in statistics.items():
+                self.__slices[name][start:stop] = values
+                self.__computed[name][start:stop] = True
+
+    def compute(self):
+        """ Pass over the volume computing the statistics of all the slices and of the volume.
+
+        The slices are read in chunks of about chunk_bytes. The histogram of the volume of the
+        integer types up to 16 bits is accumulated with a bin for each possible value, so the
+        percentiles of the volume are exact. For the other types a second pass is needed for
+        the histogram, and the percentiles are approximated.
+
+        Only one pass runs at a time, a call while another one is running waits for it and
+        doesn't compute the statistics again. After cancel() the pass stops and the statistics
+        of the volume aren't computed.
+        """
+        with self.__compute_lock:
+            if self.__volume is None:
+                self.__compute()
+
+    def cancel(self):
+        """ Stops the pass over the volume, the statistics already stored are kept.  """
+        self.__cancelled.set()
+
+    def __compute(self):
+        fine = None
+        dtype = None
+        size = 1
+        start = 0
+        # The first chunk is a slice, the next ones fill the bytes budget
+        while start < self.__n_slices:
+            chunk = self.__scan_frames(start, start + size)
+            if self.__cancelled.is_set():
+                return
+            statistics, counts = _chunk_statistics(chunk, self.__bins)
+            self.__store(start, statistics)
+            if counts is not None:
+                fine = counts if fine is None else fine + counts
+
+            dtype = chunk.dtype
+            start += len(chunk)
+            size = max(self.__chunk_bytes // max(chunk[0].nbytes, 1), 1)
+
+        if fine is not None:
+            volume = _counts_statistics(fine, dtype, self.__bins)
+        else:
+            slices = self.__slices
+            minimum, maximum = slices["minimum"].min(), slices["maximum"].max()
+            low, high = _histogram_range(minimum, maximum)
+
+            histogram = np.zeros(self.__bins, dtype=np.int64)
+            for first in range(0, self.__n_slices, size):
+                chunk = self.__scan_frames(first, first + size)
+                if self.__cancelled.is_set():
+                    return
+                histogram += funcs.histogram_counts(chunk, (low, high), self.__bins)
+
+            centers = np.linspace(low, high, self.__bins, endpoint=False) + \
+                (high - low) / (2 * self.__bins)
+            cumulative = np.cumsum(histogram)
+            positions = np.searchsorted(cumulative, np.array(PERCENTILES) / 100 *
+                                        cumulative[-1])
+            volume = {"minimum": minimum, "maximum": maximum,
+                      "mean": float(slices["mean"].mean()),
+                      "percentiles": centers[np.minimum(positions, self.__bins - 1)],
+                      "histograms": histogram}
+
+        with self.__lock:
+            self.__volume = volume
+
+        if self.__persist:
+            self.save()
+
+    def __key(self) -> np.ndarray:
+        """ Identifies the pixels of the volume, its size and modification time.
+
+        The ones of a directory don't change when a file is edited in place, so for a series
+        the number of files, their total size and the latest modification time are used, with
+        the hash of their paths to tell apart the series of the same folder.
+        """
+        stats = [os.stat(path) for path in self.__files or [self.__path]]
+        size = sum(stat.st_size for stat in stats)
+        mtime = max(stat.st_mtime_ns for stat in stats)
+
+        return np.array([VERSION, os.path.abspath(self.__path), self.__identity(), len(stats),
+                         size, mtime, self.__n_slices, self.__bins]).astype(str)
+
+    def save(self):
+        """ Writes the statistics computed to the sidecar file, errors are ignored.
+
+        The file is written with another name and then renamed, so a reader never finds it
+        partly written.
+        """
+        with self.__lock:
+            arrays = {"slice_" + name: values for name, values in self.__slices.items()}
+            arrays.update({"computed_" + name: values
+                           for name, values in self.__computed.items()})
+            if self.__volume is not None:
+                arrays.update({"volume_" + name: np.asarray(values)
+                               for name, values in self.__volume.items()})
+        sidecar = self.sidecar
+        temporary = None
+        try:
+            descriptor, temporary = tempfile.mkstemp(suffix=".tmp",
+                                                     dir=os.path.dirname(sidecar))
+            with os.fdopen(descriptor, "wb") as file:
+                np.savez(file, key=self.__key(), **arrays)
+            os.replace(temporary, sidecar)
+        except OSError:
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+
+    def load(self) -> bool:
+        """ Reads the sidecar file if its key matches the file.
+
+        Returns:
+            True if the statistics have been loaded.
+        """
+        try:
+            with np.load(self.sidecar, allow_pickle=False) as data:
+                if not np.array_equal(data["key"], self.__key()):
+                    return False
+
+                slices = {name: data["slice_" + name] for name in self.__slices}
+                computed = {name: data["computed_" + name] for name in self.__slices}
+                volume = None
+                if "volume_minimum" in data:
+                    volume = {name: data["volume_" + name] for name in self.__slices}
+                    volume["mean"] = float(volume["mean"])
+        except (OSError, KeyError, ValueError):
+            return False
+        except (zipfile.BadZipFile, EOFError):
+            # Truncated, it's removed and computed again
+            try:
+                os.remove(self.sidecar)
+            except OSError:
+                pass
+            return False
+
+        with self.__lock:
+            self.__slices = slices
+            self.__computed = computed
+            self.__volume = volume
+
+        return True
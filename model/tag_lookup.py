@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+""" Names of the Dicom tags shown on the header viewer.
+
+The dictionary is compiled once, from in/lookup.ods or, if it can't be read, from the data
+dictionary of pydicom, and saved as a pickle on the cache directory. Later runs only unpickle it,
+and only when the headers are shown for the first time.
+
+"""
+
+from typing import Dict
+import os
+import pickle
+
+import functions as funcs
+
+LOOKUP_ODS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "in",
+                          "lookup.ods")
+
+LOOKUP = None
+
+
+def _compiled_path() -> str:
+    return os.path.join(funcs.cache_dir(), "tag_lookup.pickle")
+
+
+def _source_key() -> str:
+    try:
+        stat = os.stat(LOOKUP_ODS)
+    except OSError:
+        return "pydicom"
+
+    return f"{LOOKUP_ODS}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _from_ods() -> Dict[str, str]:
+    import pandas as pd
+
+    df = pd.read_excel(LOOKUP_ODS, engine="odf")
+    df = df[["Tag", "Name"]].dropna()
+
+    return {str(tag).replace(" ", "").upper(): str(name) for tag, name in zip(df.Tag, df.Name)}
+
+
+def _from_pydicom() -> Dict[str, str]:
+    from pydicom.datadict import DicomDictionary
+
+    return {f"({tag >> 16:04X},{tag & 0xFFFF:04X})": entry[2]
+            for tag, entry in DicomDictionary.items()}
+
+
+def compile_lookup() -> Dict[str, str]:
+    """ Builds the dictionary from its source and saves it on the cache.
+
+    Returns:
+        Dictionary from the tag, formatted as (GGGG,EEEE), to its name.
+    """
+    try:
+        lookup = _from_ods()
+    except (ImportError, OSError, ValueError, KeyError):
+        lookup = _from_pydicom()
+
+    try:
+        with open(_compiled_path(), "wb") as file:
+            pickle.dump((_source_key(), lookup), file, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+
+    return lookup
+
+
+def load_lookup() -> Dict[str, str]:
+    """ Dictionary of the names of the tags, loaded the first time it's needed.
+
+    Returns:
+        Dictionary from the tag, formatted as (GGGG,EEEE), to its name.
+    """
+    global LOOKUP
+
+    if LOOKUP is None:
+        try:
+            with open(_compiled_path(), "rb") as file:
+                key, lookup = pickle.load(file)
+            if key != _source_key():
+                lookup = compile_lookup()
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            lookup = compile_lookup()
+        LOOKUP = lookup
+
+    return LOOKUP
+
+
+def tag_name(tag: str) -> str:
+    """ Name of a tag, or the tag itself if it's unknown.
+
+    Args:
+        tag (str): Tag formatted as (gggg,eeee), the case doesn't matter.
+
+    Returns:
+
+    """
+    return load_lookup().get(tag.upper(), tag)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+""" Render of the view of a slice in tiles.
+
+With zoom the view is a window over the zoomed slice. The zoomed slice is split in square tiles
+of a fixed size, and only the tiles that intersect the view are rendered, each one resampled
+from the pyramid of the slice and windowed on its own. The view keeps the tiles it shows, so
+panning only renders and uploads the tiles that come into view.
+
+"""
+
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+
+import numpy as np
+
+TILE_SIZE = 256
+TILE_BUDGET = 64 * 1024 * 1024
+
+
+class TileSet(NamedTuple):
+    """
+    Tiles of the view of a slice.
+
+    The positions are of all the tiles visible, in pixels of the view and relative to its top
+    left corner. The images are only of the tiles that weren't already shown.
+
+    """
+    shape: Tuple[int, int]
+    positions: Dict[Hashable, Tuple[int, int]]
+    images: Dict[Hashable, np.ndarray]
+
+
+def visible_tiles(shape, corner, view_shape, tile_size: int = TILE_SIZE) -> List[Tuple[int, int]]:
+    """ Tiles of an image that intersect a view over it.
+
+    Args:
+        shape: Rows and columns of the image.
+        corner: Top left corner of the view on the image, (row, column).
+        view_shape: Rows and columns of the view.
+        tile_size (int): Side of the tiles, in pixels.
+
+    Returns:
+        List of the indices (row, column) of the tiles.
+    """
+    first = np.maximum(np.asarray(corner, dtype=int), 0) // tile_size
+    stop = np.minimum(np.asarray(corner) + np.asarray(view_shape), np.asarray(shape))
+    last = (np.ceil(stop).astype(int) - 1) // tile_size
+
+    return [(row, column) for row in range(first[0], last[0] + 1)
+            for column in range(first[1], last[1] + 1)]
+
+
+def tile_shape(shape, tile: Tuple[int, int], tile_size: int = TILE_SIZE) -> Tuple[int, int]:
+    """ Rows and columns of a tile, the ones of the last row and column can be smaller.  """
+    return (min(tile_size, int(shape[0]) - tile[0] * tile_size),
+            min(tile_size, int(shape[1]) - tile[1] * tile_size))
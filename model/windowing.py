@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+""" Windowing of the images through lookup tables.
+
+The window maps the stored values of the pixels to grey levels. For the integer types up to 16
+bits a table with an entry for every possible value is built once per window and applied with a
+single indexing pass, the output is directly an uint8 image.
+
+"""
+
+from functools import lru_cache
+from typing import List, Tuple, Union
+
+import numpy as np
+from pydicom.dataset import Dataset
+
+Num = Union[int, float]
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    try:
+        return [float(v) for v in value]
+    except TypeError:
+        return [float(value)]
+
+
+@lru_cache(maxsize=32)
+def build_lut(low: float, high: float, dtype: str) -> np.ndarray:
+    """ Lookup table of a window for all the values of an integer type.
+
+    The table is ordered to be indexed with the image viewed as unsigned, so the signed types
+    don't need any offset.
+
+    Args:
+        low (float): Stored value mapped to 0.
+        high (float): Stored value mapped to 255.
+        dtype (str): Numpy type of the image.
+
+    Returns:
+        Array of uint8 with an entry for each value of the type.
+    """
+    dtype = np.dtype(dtype)
+    info = np.iinfo(dtype)
+
+    values = np.arange(info.min, info.max + 1, dtype=np.float64)
+    lut = np.clip((values - low) * (255 / max(high - low, 1e-6)), 0, 255)
+    lut = np.rint(lut).astype(np.uint8)
+
+    if info.min < 0:
+        lut = np.roll(lut, -info.min)
+
+    return lut
+
+
+def apply_window(img: np.ndarray, low: float, high: float) -> np.ndarray:
+    """ Applies a window to an image.
+
+    Args:
+        img (np.ndarray): Image with the stored values.
+        low (float): Stored value mapped to 0.
+        high (float): Stored value mapped to 255.
+
+    Returns:
+        The image as uint8.
+    """
+    if img.dtype.kind in "ui" and img.dtype.itemsize <= 2:
+        lut = build_lut(float(low), float(high), img.dtype.str)
+        unsigned = np.dtype(f"u{img.dtype.itemsize}")
+
+        return lut[img.view(unsigned)]
+
+    img = (img - low) * (255 / max(high - low, 1e-6))
+
+    return np.clip(img, 0, 255, out=img).astype(np.uint8)
+
+
+class Windowing:
+    """
+    Relation between the stored values and the window of a Dicom file.
+
+    The windows are expressed in modality units (Hounsfield units for CT), through the Rescale
+    Slope and the Rescale Intercept they are converted to stored values, so the rescale doesn't
+    cost any pass over the image.
+
+    """
+
+    def __init__(self, dataset: Dataset):
+        self.__slope = float(getattr(dataset, "RescaleSlope", 1) or 1)
+        self.__intercept = float(getattr(dataset, "RescaleIntercept", 0) or 0)
+
+        centers = _as_list(getattr(dataset, "WindowCenter", None))
+        widths = _as_list(getattr(dataset, "WindowWidth", None))
+        self.__presets = list(zip(centers, widths))
+
+    @property
+    def slope(self) -> float:
+        return self.__slope
+
+    @property
+    def intercept(self) -> float:
+        return self.__intercept
+
+    @property
+    def presets(self) -> List[Tuple[float, float]]:
+        """ Windows defined on the file as (center, width) """
+        return self.__presets
+
+    def to_modality(self, value):
+        return value * self.__slope + self.__intercept
+
+    def to_stored(self, value):
+        return (value - self.__intercept) / self.__slope
+
+    def stored_window(self, center: Num, width: Num) -> Tuple[float, float]:
+        """ Converts a window in modality units to the stored values limits.
+
+        Args:
+            center (Num): Center of the window.
+            width (Num): Width of the window.
+
+        Returns:
+            Tuple with the stored values mapped to 0 and 255.
+        """
+        low = self.to_stored(center - width / 2)
+        high = self.to_stored(center + width / 2)
+
+        return min(low, high), max(low, high)
+
+    @staticmethod
+    def contrast_window(contrast: List[Num], minimum: Num, maximum: Num) -> Tuple[float, float]:
+        """ Converts the contrast, as fraction of the values range, to stored values limits.
+
+        Args:
+            contrast (List[Num]): Two values between 0 and 1.
+            minimum (Num): Minimum value of the image.
+            maximum (Num): Maximum value of the image.
+
+        Returns:
+            Tuple with the stored values mapped to 0 and 255.
+        """
+        assert max(contrast) <= 1 and min(contrast) >= 0
+
+        adder = abs(min(0, minimum))
+
+        low = (maximum + adder) * min(contrast) - adder
+        high = (maximum + adder) * max(contrast) - adder
+
+        return low, high
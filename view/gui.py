@@ -14,6 +14,9 @@ class View(tk.Tk):
 
         self.__fr_button = None
         self.__fr_images = None
+        self.__plane = None
+        self.__projection = None
+        self.__thickness = None
 
     def set_functions(self, movements, depth, zoom, histogram, histogram_release, pixel_value,
                       distance, **kwargs):
@@ -51,15 +54,54 @@ class View(tk.Tk):
         functions = self.__functions
 
         btn_open = tk.Button(fr_buttons, text="Obrir", command=functions["file_o"])
+        btn_series = tk.Button(fr_buttons, text="Obrir sèrie", command=functions["series_o"])
         btn_headers = tk.Button(fr_buttons, text="Capceleres", command=functions["header_s"])
         btn_adv_viewer = tk.Button(fr_buttons, text="Visualitzador avançat",
                                    command=functions["adv_viewer"])
         btn_history = tk.Button(fr_buttons, text="Historial", command=functions["history"])
+        btn_profile = tk.Button(fr_buttons, text="Exportar perfil",
+                                command=functions["export_profile"])
 
         btn_open.grid(row=0, column=0, sticky="ew", padx=5, pady=5)
-        btn_headers.grid(row=1, column=0, sticky="ew", padx=5)
-        btn_adv_viewer.grid(row=2, column=0, sticky="ew", padx=5)
-        btn_history.grid(row=3, column=0, sticky="ew", padx=5)
+        btn_series.grid(row=1, column=0, sticky="ew", padx=5)
+        btn_headers.grid(row=2, column=0, sticky="ew", padx=5)
+        btn_adv_viewer.grid(row=3, column=0, sticky="ew", padx=5)
+        btn_history.grid(row=4, column=0, sticky="ew", padx=5)
+        btn_profile.grid(row=5, column=0, sticky="ew", padx=5)
+
+        self.__plane = tk.StringVar(fr_buttons, value="axial")
+        lbl_plane = tk.Label(fr_buttons, text="Pla")
+        lbl_plane.grid(row=6, column=0, sticky="w", padx=5, pady=(10, 0))
+        for row, (plane, text) in enumerate([("axial", "Axial"), ("coronal", "Coronal"),
+                                             ("sagittal", "Sagital")], start=7):
+            rb_plane = tk.Radiobutton(fr_buttons, text=text, value=plane, variable=self.__plane,
+                                      command=lambda: functions["plane"](self.__plane.get()))
+            rb_plane.grid(row=row, column=0, sticky="w", padx=5)
+
+        self.__projection = tk.StringVar(fr_buttons, value="none")
+        self.__thickness = tk.IntVar(fr_buttons, value=10)
+
+        def change_projection(*_):
+            try:
+                thickness = self.__thickness.get()
+            except tk.TclError:
+                return
+            functions["projection"](self.__projection.get(), thickness)
+
+        lbl_projection = tk.Label(fr_buttons, text="Projecció")
+        lbl_projection.grid(row=10, column=0, sticky="w", padx=5, pady=(10, 0))
+        for row, (mode, text) in enumerate([("none", "Cap"), ("mip", "MIP"), ("minip", "MinIP"),
+                                            ("avgip", "AvgIP")], start=11):
+            rb_projection = tk.Radiobutton(fr_buttons, text=text, value=mode,
+                                           variable=self.__projection, command=change_projection)
+            rb_projection.grid(row=row, column=0, sticky="w", padx=5)
+
+        lbl_thickness = tk.Label(fr_buttons, text="Gruix (talls)")
+        lbl_thickness.grid(row=15, column=0, sticky="w", padx=5)
+        sb_thickness = tk.Spinbox(fr_buttons, from_=2, to=500, width=5,
+                                  textvariable=self.__thickness, command=change_projection)
+        sb_thickness.bind("<Return>", change_projection)
+        sb_thickness.grid(row=16, column=0, sticky="w", padx=5)
 
         fr_buttons.grid(row=0, column=0, sticky="ns")
 
@@ -68,15 +110,40 @@ class View(tk.Tk):
     def show_image(self, img, histogram: np.ndarray = None):
         self.__image_container.update_image(img, histogram)
 
+    def show_tiles(self, tile_set, histogram: np.ndarray = None) -> bool:
+        """ Shows the image as tiles, returns False if a visible tile is missing.  """
+        return self.__image_container.update_tiles(tile_set, histogram)
+
+    @property
+    def tiles_shown(self) -> frozenset:
+        return self.__image_container.tiles_shown
+
     def set_n_images(self, value: int):
         self.__image_container.set_n_images(value)
 
+    def set_depth(self, value: int):
+        self.__image_container.set_depth(value)
+
+    def set_plane(self, plane: str):
+        if self.__plane is not None:
+            self.__plane.set(plane)
+
+    def set_projection(self, mode: str):
+        if self.__projection is not None:
+            self.__projection.set(mode)
+
     def move_line(self, id_line: int, front: bool, velocity: int):
         self.__image_container.move_histogram_line(id_line, front, velocity)
 
     def lines_position(self):
         return self.__image_container.lines_position()
 
+    def line_fractions(self):
+        return self.__image_container.line_fractions()
+
+    def set_line_fractions(self, fractions):
+        self.__image_container.set_line_fractions(fractions)
+
     def get_histogram_position(self):
         return self.__image_container.get_histogram_position()
 
@@ -92,3 +159,7 @@ class View(tk.Tk):
     @property
     def img_space(self):
         return self.__image_container.img_space
+
+    @property
+    def histogram_space(self):
+        return self.__image_container.histogram_space
@@ -44,6 +44,25 @@ class CanvasHistogram(canvasimage.CanvasImage):
         self._canvas.coords(self.__max_line, bbox[2], bbox[1], bbox[2], bbox[3] - 1)
         self._canvas.coords(self.__min_line, bbox[0], bbox[1], bbox[0], bbox[3] - 1)
 
+    def line_fractions(self):
+        """ Position of each line as a fraction of the width of the histogram, between 0 and 1. """
+        bbox = self.get_bbox()
+        width = max(bbox[2] - bbox[0], 1)
+        for i in range(0, 2):
+            x = self._canvas.coords(self.__get_line(i))[0]
+            yield min(max((x - bbox[0]) / width, 0), 1)
+
+    def set_line_fractions(self, fractions):
+        """ Places the lines on fractions of the width of the histogram.
+
+        Args:
+            fractions: Position of the minimum and of the maximum line, between 0 and 1.
+        """
+        bbox = self.get_bbox()
+        for i, fraction in enumerate(fractions):
+            x = bbox[0] + fraction * (bbox[2] - bbox[0])
+            self._canvas.coords(self.__get_line(i), x, bbox[1], x, bbox[3] - 1)
+
     def lines_bb(self):
         """
         Yield the bounding box of each line.
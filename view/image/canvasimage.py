@@ -2,6 +2,10 @@ from view import view_component
 import numpy as np
 import tkinter as tk
 
+IMAGE_X = 10
+# Far enough to cover the canvas from any point of the image
+MASK_END = 100000
+
 
 class CanvasImage(view_component.VComponent):
 
@@ -12,6 +16,10 @@ class CanvasImage(view_component.VComponent):
         self.__image = None
         self.__scale_depth = None
         self.__image_raw = None
+        self.__frame_rate = view_component.FrameRate()
+
+        self.__tiles = {}
+        self.__masks = []
 
         super().__init__(**kwargs)
 
@@ -20,12 +28,12 @@ class CanvasImage(view_component.VComponent):
 
     def __draw_img(self, img_raw=None):
         if img_raw is None:
-            img_raw = np.ones((self._height, self._width)) * 255
+            img_raw = np.full((self._height, self._width), 255, dtype=np.uint8)
         img = super().numpy_2_tkinter(img_raw)
 
         canvas = tk.Canvas(self.__parent, bd=0, width=self._width, height=self._height)
         canvas.grid(row=self._row, column=self._column, sticky="new")
-        image_on_canvas = canvas.create_image(10, 0, anchor="nw", image=img)
+        image_on_canvas = canvas.create_image(IMAGE_X, 0, anchor="nw", image=img)
 
         self.__image_raw = img_raw
         self.__image = img
@@ -40,21 +48,108 @@ class CanvasImage(view_component.VComponent):
             canvas.bind(k, func)
 
     def show_image(self, img_raw: np.ndarray):
+        """ Shows an image on the canvas.
+
+        The PhotoImage on the canvas is kept and only its pixels are replaced, a new one is only
+        created when the size or the type of the image changes.
+
+        Args:
+            img_raw (np.ndarray): Image to show.
+
+        Returns:
+
+        """
         assert self._image_on_canvas is not None
 
-        pre_bbox = np.array(self._canvas.bbox(self._image_on_canvas))
-        pre_size = np.array([pre_bbox[2] - pre_bbox[0], pre_bbox[3] - pre_bbox[1]])
+        self.__clear_tiles()
+        self.__set_image(img_raw)
+        self.__frame_rate.tick()
 
-        img = CanvasImage.numpy_2_tkinter(img_raw)
-        self._canvas.itemconfig(self._image_on_canvas, image=img)
-        bbox = np.array(self._canvas.bbox(self._image_on_canvas))
-        size = np.array([bbox[2] - bbox[0], bbox[3] - bbox[1]])
+    def __set_image(self, img_raw: np.ndarray):
+        pre_raw = self.__image_raw
+        if pre_raw.shape == img_raw.shape and pre_raw.dtype == img_raw.dtype:
+            CanvasImage.paste_numpy(self.__image, img_raw)
+        else:
+            img = CanvasImage.numpy_2_tkinter(img_raw)
+            self._canvas.itemconfig(self._image_on_canvas, image=img)
+            self.__image = img
 
-        if np.linalg.norm((pre_size - size)) > 10:
-            self._reset_local_gui()
+            pre_size = np.array(pre_raw.shape[:2])
+            size = np.array(img_raw.shape[:2])
+            if np.linalg.norm((pre_size - size)) > 10:
+                self._reset_local_gui()
 
         self.__image_raw = img_raw
-        self.__image = img
+
+    def show_tiles(self, tile_set) -> bool:
+        """ Shows an image made of tiles, each one on its own PhotoImage.
+
+        The tiles already shown are only moved and the ones not visible any more are removed,
+        so panning only uploads the new tiles. The image of show_image is kept below the tiles,
+        with the size of the view, and the tiles are masked outside of it.
+
+        Args:
+            tile_set (TileSet): Visible tiles, see model.tiles.
+
+        Returns:
+            False if a visible tile is neither on the tile set nor shown.
+        """
+        assert self._image_on_canvas is not None
+
+        canvas = self._canvas
+        if self.__image_raw.shape[:2] != tuple(tile_set.shape):
+            self.__set_image(np.zeros(tile_set.shape, dtype=np.uint8))
+
+        for key in [key for key in self.__tiles if key not in tile_set.positions]:
+            canvas.delete(self.__tiles.pop(key)[0])
+
+        complete = True
+        for key, (row, column) in tile_set.positions.items():
+            if key in self.__tiles:
+                canvas.coords(self.__tiles[key][0], IMAGE_X + column, row)
+            elif key in tile_set.images:
+                img = CanvasImage.numpy_2_tkinter(tile_set.images[key])
+                item = canvas.create_image(IMAGE_X + column, row, anchor="nw", image=img)
+                self.__tiles[key] = (item, img)
+            else:
+                complete = False
+
+        self.__mask_tiles(tile_set.shape)
+        self.__frame_rate.tick()
+
+        return complete
+
+    @property
+    def tiles_shown(self) -> frozenset:
+        """ Keys of the tiles on the canvas.  """
+        return frozenset(self.__tiles)
+
+    def __mask_tiles(self, shape):
+        """ Covers the canvas around the image, where the tiles on its border would be seen.  """
+        canvas = self._canvas
+        if not self.__masks:
+            self.__masks = [canvas.create_rectangle(0, 0, 0, 0, fill=canvas["background"],
+                                                    outline="") for _ in range(3)]
+
+        height, width = shape
+        areas = [(0, 0, IMAGE_X, MASK_END), (IMAGE_X + width, 0, MASK_END, MASK_END),
+                 (0, height, MASK_END, MASK_END)]
+        for mask, area in zip(self.__masks, areas):
+            canvas.coords(mask, *area)
+            canvas.tag_raise(mask)
+
+    def __clear_tiles(self):
+        for item, _ in self.__tiles.values():
+            self._canvas.delete(item)
+        for mask in self.__masks:
+            self._canvas.delete(mask)
+        self.__tiles = {}
+        self.__masks = []
+
+    @property
+    def fps(self) -> float:
+        """ Images shown per second. """
+        return self.__frame_rate.fps
 
     def get_bbox(self, item=None):
         if item is None:
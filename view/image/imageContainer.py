@@ -7,6 +7,7 @@ import numpy as np
 class ContainerImage(tk.Frame):
     __pixel_value_fixed = "Valor de píxel: "
     __distance_value_fixed = " Distància: "
+    __fps_fixed = " FPS: "
 
     def __init__(self, parent, **kwargs):
         super().__init__(parent, **kwargs)
@@ -14,6 +15,7 @@ class ContainerImage(tk.Frame):
         # self.__functions = None
         space = (600, 400)
         self.__img_size = space
+        self.__histogram_size = (640, 480)
         self.__canvas_image = canvasimage.CanvasImage(parent=self, row=0, column=0, size=space)
         self.__canvas_histogram = canvasHistogram.CanvasHistogram(parent=self, row=2, column=0,
                                                                   size=(680, 480))
@@ -24,6 +26,7 @@ class ContainerImage(tk.Frame):
 
         self.__pixel_value = ""
         self.__distance_value = ""
+        self.__fps_value = ""
 
         self.__f_depth = None
         self.__f_zoom = None
@@ -31,7 +34,11 @@ class ContainerImage(tk.Frame):
     def set_n_images(self, value: int):
         self.__n_images = value
         if self.__scale_depth is not None:
-            self.__scale_depth.configure(to=value)
+            self.__scale_depth.configure(to=max(value - 1, 0))
+
+    def set_depth(self, value: int):
+        if self.__scale_depth is not None:
+            self.__scale_depth.set(value)
 
     def set_functions(self, movements, depth, zoom, histogram, histogram_release, pixel_value,
                       distance):
@@ -66,10 +73,32 @@ class ContainerImage(tk.Frame):
     def img_space(self):
         return self.__img_size
 
+    @property
+    def histogram_space(self):
+        return self.__histogram_size
+
     def update_image(self, img: np.ndarray, histogram=None):
         self.__canvas_image.show_image(img)
+        self.__update_shown(histogram)
+
+    def update_tiles(self, tile_set, histogram=None) -> bool:
+        complete = self.__canvas_image.show_tiles(tile_set)
+        self.__update_shown(histogram)
+
+        return complete
+
+    @property
+    def tiles_shown(self) -> frozenset:
+        return self.__canvas_image.tiles_shown
+
+    def __update_shown(self, histogram):
         self.__scale_zoom.configure(to=100)
 
+        fps_value = f"{self.__canvas_image.fps:.0f}"
+        if fps_value != self.__fps_value:
+            self.__fps_value = fps_value
+            self.__label_pixel["text"] = self.__get_label_text()
+
         if histogram is not None:
             self.__canvas_histogram.show_image(histogram)
 
@@ -79,9 +108,19 @@ class ContainerImage(tk.Frame):
     def lines_position(self):
         return list(self.__canvas_histogram.lines_bb())
 
+    def line_fractions(self) -> List[float]:
+        return list(self.__canvas_histogram.line_fractions())
+
+    def set_line_fractions(self, fractions: List[float]):
+        self.__canvas_histogram.set_line_fractions(fractions)
+
     def get_image_position(self) -> List[int]:
         return self.__canvas_image.get_bbox()
 
+    @property
+    def fps(self) -> float:
+        return self.__canvas_image.fps
+
     def get_histogram_position(self) -> List[int]:
         return self.__canvas_histogram.get_bbox()
 
@@ -97,4 +136,4 @@ class ContainerImage(tk.Frame):
 
     def __get_label_text(self) -> str:
         return self.__pixel_value_fixed + self.__pixel_value + self.__distance_value_fixed + \
-               self.__distance_value
+               self.__distance_value + self.__fps_fixed + self.__fps_value
@@ -47,3 +47,99 @@ def make_table(title: str, dades, headers):
     root.title(title)
     Table(root, dades, headers)
     root.mainloop()
+
+
+class VirtualTable(Frame):
+    """
+    Table that only creates the items of the visible rows.
+
+    The rows are requested to get_row when they are shown, so the time to open the table doesn't
+    depend on the number of rows. If activate is passed it's called with the index of a row when
+    it's double clicked, and returns the new number of rows, to open and close the nodes of a
+    tree.
+
+    """
+
+    def __init__(self, parent, n_rows, get_row, headers, height=30, activate=None, first=None):
+        self.__headers = headers
+        self.__n_rows = n_rows
+        self.__get_row = get_row
+        self.__activate = activate
+        self.__height = height
+        self.__first = 0
+
+        Frame.__init__(self, parent)
+        self.CreateUI()
+        self.ShowRows(max(n_rows - self.__height, 0) if first is None else first)
+        self.grid(sticky=(N, S, W, E))
+        parent.grid_rowconfigure(0, weight=1)
+        parent.grid_columnconfigure(0, weight=1)
+
+    def CreateUI(self):
+        tv = Treeview(self, height=self.__height)
+        header_key = [h.lower().replace(" ", "") for h in self.__headers[1:]]
+
+        tv['columns'] = header_key
+        tv.heading("#0", text=self.__headers[0], anchor='w')
+        tv.column("#0", anchor="w")
+
+        for h_key, header in zip(header_key, self.__headers[1:]):
+            tv.heading(h_key, text=header, anchor='w')
+            tv.column(h_key, anchor='w')
+
+        for _ in range(self.__height):
+            tv.insert('', 'end', text="", values=[""] * len(header_key))
+
+        scrollbar = Scrollbar(self, orient=VERTICAL, command=self.__scroll)
+        tv.grid(row=0, column=0, sticky=(N, S, W, E))
+        scrollbar.grid(row=0, column=1, sticky=(N, S))
+        tv.bind("<MouseWheel>", lambda e: self.ShowRows(self.__first - e.delta // 120))
+        tv.bind("<Button-4>", lambda e: self.ShowRows(self.__first - 1))
+        tv.bind("<Button-5>", lambda e: self.ShowRows(self.__first + 1))
+        tv.bind("<Double-Button-1>", self.__on_activate)
+
+        self.treeview = tv
+        self.scrollbar = scrollbar
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=2)
+
+    def ShowRows(self, first):
+        """ Fills the items of the table with the rows from first.  """
+        first = min(max(int(first), 0), max(self.__n_rows - self.__height, 0))
+        self.__first = first
+
+        n_values = len(self.__headers) - 1
+        for item, idx in zip(self.treeview.get_children(), range(first, first + self.__height)):
+            if idx < self.__n_rows:
+                row = self.__get_row(idx)
+                self.treeview.item(item, text=row[0], values=list(row[1:]))
+            else:
+                self.treeview.item(item, text="", values=[""] * n_values)
+
+        if self.__n_rows:
+            self.scrollbar.set(first / self.__n_rows,
+                               min(first + self.__height, self.__n_rows) / self.__n_rows)
+
+    def __on_activate(self, event):
+        item = self.treeview.identify_row(event.y)
+        if not item or self.__activate is None:
+            return
+
+        idx = self.__first + self.treeview.index(item)
+        if idx < self.__n_rows:
+            self.__n_rows = self.__activate(idx)
+            self.ShowRows(self.__first)
+
+    def __scroll(self, action, value, unit=None):
+        if action == MOVETO:
+            self.ShowRows(float(value) * self.__n_rows)
+        elif action == SCROLL:
+            step = self.__height if unit == PAGES else 1
+            self.ShowRows(self.__first + int(value) * step)
+
+
+def make_virtual_table(title: str, n_rows: int, get_row, headers, activate=None, first=None):
+    root = Tk()
+    root.title(title)
+    VirtualTable(root, n_rows, get_row, headers, activate=activate, first=first)
+    root.mainloop()
@@ -1,4 +1,6 @@
 import abc
+import collections
+import time
 from PIL import Image, ImageTk
 import numpy as np
 from typing import Tuple
@@ -25,3 +27,46 @@ class VComponent(abc.ABC):
         img = ImageTk.PhotoImage(image=Image.fromarray(img_raw))
 
         return img
+
+    @staticmethod
+    def paste_numpy(photo: ImageTk.PhotoImage, img_raw: np.ndarray):
+        """ Replaces the pixels of a PhotoImage, without creating a new one.
+
+        The image must have the size of the PhotoImage.
+
+        Args:
+            photo (ImageTk.PhotoImage): Image shown.
+            img_raw (np.ndarray): New pixels.
+
+        Returns:
+
+        """
+        photo.paste(Image.fromarray(img_raw))
+
+
+class FrameRate:
+    """
+    Frames per second shown, measured over the frames of the last seconds.
+
+    """
+
+    def __init__(self, window: float = 1.0):
+        self.__window = window
+        self.__times = collections.deque()
+
+    def tick(self):
+        """ Registers a frame shown now. """
+        now = time.perf_counter()
+        times = self.__times
+
+        times.append(now)
+        while now - times[0] > self.__window:
+            times.popleft()
+
+    @property
+    def fps(self) -> float:
+        times = self.__times
+        if len(times) < 2 or time.perf_counter() - times[-1] > self.__window:
+            return 0.0
+
+        return (len(times) - 1) / (times[-1] - times[0])